@@ -0,0 +1,122 @@
+"""Bearer session authentication backed by a cached session store.
+
+``login`` writes a document to ``db.sessions`` and warms the cache with the
+session's user, so authenticated requests resolve ``Authorization: Bearer
+<session_id>`` without touching MongoDB in the common case. The cache is an
+in-process LRU with TTL by default, or Redis when ``SESSION_CACHE_URL`` is
+set and the ``redis`` package is installed.
+
+Logging out deletes the session and its cache entry. Redis is shared, so
+the token stops working everywhere at once. The in-process cache is not,
+so it keeps entries for at most ``LOCAL_SESSION_CACHE_TTL`` seconds: other
+workers may accept a logged-out token for that long before they go back to
+``db.sessions`` and find it gone.
+"""
+import json
+import logging
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+from cache import TTLCache
+
+try:
+    import redis.asyncio as redis_asyncio
+except ImportError:  # redis is optional
+    redis_asyncio = None
+
+logger = logging.getLogger(__name__)
+
+SESSION_USER_PROJECTION = {"_id": 0, "password": 0}
+
+# Longest a worker-local cache trusts a session another worker may have revoked
+LOCAL_SESSION_CACHE_TTL = 10.0
+
+
+class MemorySessionCache:
+    max_ttl = LOCAL_SESSION_CACHE_TTL
+
+    def __init__(self, maxsize: int = 10000, timer: Callable[[], float] = time.monotonic):
+        self._cache = TTLCache(maxsize=maxsize, timer=timer)
+
+    async def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        return self._cache.get(session_id)
+
+    async def set(self, session_id: str, entry: Dict[str, Any], ttl: float):
+        self._cache.set(session_id, entry, ttl=ttl)
+
+    async def delete(self, session_id: str):
+        self._cache.pop(session_id)
+
+
+class RedisSessionCache:
+    max_ttl = float("inf")
+
+    def __init__(self, url: str, prefix: str = "actify:session:"):
+        if redis_asyncio is None:
+            raise RuntimeError("SESSION_CACHE_URL is set but the redis package is not installed")
+        self._redis = redis_asyncio.from_url(url)
+        self.prefix = prefix
+
+    async def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        raw = await self._redis.get(self.prefix + session_id)
+        if raw is None:
+            return None
+        entry = json.loads(raw)
+        entry["expires_at"] = datetime.fromisoformat(entry["expires_at"])
+        return entry
+
+    async def set(self, session_id: str, entry: Dict[str, Any], ttl: float):
+        raw = json.dumps(entry, default=lambda value: value.isoformat() if isinstance(value, datetime) else str(value))
+        await self._redis.set(self.prefix + session_id, raw, ex=max(1, int(ttl)))
+
+    async def delete(self, session_id: str):
+        await self._redis.delete(self.prefix + session_id)
+
+
+def create_session_cache(url: Optional[str] = None):
+    if url:
+        return RedisSessionCache(url)
+    return MemorySessionCache()
+
+
+class SessionAuthenticator:
+    def __init__(self, db, cache, ttl: float = 300.0):
+        self.sessions = db.sessions
+        self.users = db.users
+        self.cache = cache
+        self.ttl = min(ttl, cache.max_ttl)
+
+    async def resolve(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Return the user a session belongs to, or None if it is unknown or expired"""
+        now = datetime.utcnow()
+        entry = await self.cache.get(session_id)
+        if entry is not None:
+            if entry["expires_at"] > now:
+                return entry["user"]
+            await self.cache.delete(session_id)
+            return None
+
+        session = await self.sessions.find_one({"session_id": session_id})
+        if not session or session["expires_at"] <= now:
+            return None
+        user = await self.users.find_one({"id": session["user_id"]}, SESSION_USER_PROJECTION)
+        if not user:
+            return None
+        await self.remember(session, user)
+        return user
+
+    async def remember(self, session: Dict[str, Any], user: Dict[str, Any]):
+        """Cache a session's user until the cache TTL or the session expiry, whichever is first"""
+        user = {key: value for key, value in user.items() if key not in ("_id", "password")}
+        remaining = (session["expires_at"] - datetime.utcnow()).total_seconds()
+        if remaining > 0:
+            await self.cache.set(
+                session["session_id"],
+                {"user": user, "expires_at": session["expires_at"]},
+                ttl=min(self.ttl, remaining)
+            )
+
+    async def revoke(self, session_id: str):
+        await self.cache.delete(session_id)
+        await self.sessions.delete_one({"session_id": session_id})
@@ -0,0 +1,383 @@
+"""Load test and benchmark harness for the ACTIFY API.
+
+Boots ``server:app`` in-process behind an httpx ASGI transport, seeds a
+database with generated users, groups, follows, submissions and votes, then
+drives concurrent scenarios against it and prints per-endpoint latency
+percentiles and throughput as JSON, so runs can be compared between commits:
+
+    python benchmark.py                              # in-memory MongoDB stand-in
+    python benchmark.py --users 2000 --concurrency 50 --output before.json
+    python benchmark.py --mongo-url mongodb://localhost:27017 --scenarios feed votes
+
+The in-memory stand-in needs ``mongomock-motor``; both modes need ``httpx``.
+With ``--mongo-url`` the run uses a throwaway database that is dropped at the
+end. Timings against the stand-in are only meaningful relative to each other.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from follow_graph import backfill_follow_counts
+
+try:
+    import httpx
+except ImportError:  # only needed to run the benchmark
+    httpx = None
+
+try:
+    from mongomock_motor import AsyncMongoMockClient
+except ImportError:  # only needed for the in-memory stand-in
+    AsyncMongoMockClient = None
+
+SCENARIOS = ("login", "feed", "votes", "drop")
+PASSWORD = "benchmark-password"
+MAX_GROUP_MEMBERS = 7  # the API caps groups at 7 members
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+class Recorder:
+    """Collects request latencies per endpoint label"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    async def call(self, client, method: str, label: str, url: str, **kwargs):
+        started = time.perf_counter()
+        response = await client.request(method, url, **kwargs)
+        self.latencies[label].append((time.perf_counter() - started) * 1000)
+        if response.status_code >= 400:
+            self.errors[label] += 1
+        return response
+
+    def report(self, elapsed: float) -> Dict[str, Any]:
+        endpoints = {}
+        for label, values in sorted(self.latencies.items()):
+            values = sorted(values)
+            endpoints[label] = {
+                "requests": len(values),
+                "errors": self.errors[label],
+                "throughput_rps": round(len(values) / elapsed, 1) if elapsed else 0.0,
+                "mean_ms": round(sum(values) / len(values), 2),
+                "p50_ms": round(percentile(values, 50), 2),
+                "p95_ms": round(percentile(values, 95), 2),
+                "p99_ms": round(percentile(values, 99), 2),
+            }
+        return endpoints
+
+
+class Benchmark:
+    def __init__(self, server, args):
+        self.server = server
+        self.client = None
+        self.args = args
+        self.random = random.Random(args.seed)
+        self.users: List[Dict[str, Any]] = []
+        self.groups: List[str] = []
+        self.challenge_id: Optional[str] = None
+        self.submission_ids: List[str] = []
+
+    async def seed(self):
+        """Insert the configured volumes directly, in the shapes the API writes them.
+
+        Runs before the app starts, so indexes are built once over the seeded
+        data and the startup backfills (leaderboards) see it.
+        """
+        server, args, rng = self.server, self.args, self.random
+        db = server.db
+        now = datetime.utcnow()
+        password = server.hash_password(PASSWORD)
+
+        for i in range(args.users):
+            username = f"user{i:06d}"
+            self.users.append({
+                "id": str(uuid.uuid4()),
+                "username": username,
+                "email": f"{username}@bench.local",
+                "password": password,
+                "full_name": f"Bench User {i}",
+                "search_prefixes": server.search_prefixes(username, f"Bench User {i}"),
+                "created_at": now - timedelta(days=30),
+                "avatar_color": "#4ECDC4",
+                "groups": [],
+                "achievements": [],
+                "stats": {"total_activities": 0, "current_streak": 0, "total_groups_joined": 0,
+                          "followers_count": 0, "following_count": 0},
+            })
+
+        groups = []
+        for i in range(args.groups):
+            members = rng.sample(self.users, min(len(self.users), args.group_size))
+            group_id = str(uuid.uuid4())
+            groups.append({
+                "id": group_id,
+                "name": f"Bench Group {i}",
+                "description": "",
+                "category": "fitness",
+                "is_public": True,
+                "created_by": members[0]["id"],
+                "admin_id": members[0]["id"],
+                "invite_code": f"B{i:05d}",
+                "created_at": now - timedelta(days=30),
+                "members": [member["id"] for member in members],
+                "member_count": len(members),
+                "max_members": MAX_GROUP_MEMBERS,
+                "current_challenge": "Weekly Activity Challenge",
+                "submission_day": None,
+                "current_week_start": None,
+                "activities_submitted_this_week": 0,
+                "activities_needed": 7,
+                "submission_phase_active": False,
+                "daily_reveals": [],
+                "current_day_activity": None,
+                "weekly_rankings": [],
+                "current_week_points": {member["id"]: 0 for member in members},
+            })
+            for member in members:
+                member["groups"].append(group_id)
+            self.groups.append(group_id)
+
+        follows = {}
+        for user in self.users:
+            for target in rng.sample(self.users, min(len(self.users), args.follows_per_user)):
+                if target["id"] != user["id"]:
+                    follows[(user["id"], target["id"])] = {
+                        "id": str(uuid.uuid4()),
+                        "follower_id": user["id"],
+                        "following_id": target["id"],
+                        "created_at": now - timedelta(days=1),
+                    }
+
+        usernames = {user["id"]: user["username"] for user in self.users}
+        submissions = []
+        for group in groups:
+            for i in range(args.submissions_per_group):
+                author = rng.choice(group["members"])
+                submissions.append({
+                    "id": str(uuid.uuid4()),
+                    "user_id": author,
+                    "username": usernames[author],
+                    "group_id": group["id"],
+                    "challenge_type": "workout",
+                    "description": "benchmark submission",
+                    "photo": None,
+                    "photo_url": None,
+                    "created_at": now - timedelta(minutes=i),
+                    "votes": 0,
+                    "comments": [],
+                    "reactions": {},
+                })
+
+        self.challenge_id = str(uuid.uuid4())
+        challenge = {
+            "id": self.challenge_id,
+            "prompt": "Benchmark challenge",
+            "created_at": now - timedelta(hours=1),
+            "expires_at": now + timedelta(hours=5),
+            "promptness_window_minutes": 5,
+            "is_active": True,
+            "activated_at": now - timedelta(hours=1),
+        }
+        participants = self.users[:int(len(self.users) * args.participation)]
+        global_submissions, votes = [], []
+        for i, user in enumerate(participants):
+            submission_id = str(uuid.uuid4())
+            voters = rng.sample(participants, min(len(participants), args.votes_per_submission))
+            global_submissions.append({
+                "id": submission_id,
+                "user_id": user["id"],
+                "username": user["username"],
+                "challenge_id": self.challenge_id,
+                "challenge_prompt": challenge["prompt"],
+                "description": "benchmark global submission",
+                "photo": None,
+                "photo_url": None,
+                "created_at": now - timedelta(seconds=i),
+                "votes": len(voters),
+                "comment_count": 0,
+                "comments": [],
+                "reactions": {},
+            })
+            votes.extend(
+                {"id": str(uuid.uuid4()), "submission_id": submission_id, "user_id": voter["id"], "created_at": now}
+                for voter in voters
+            )
+            self.submission_ids.append(submission_id)
+
+        for collection, docs in (
+            (db.users, self.users), (db.groups, groups), (db.follows, list(follows.values())),
+            (db.submissions, submissions), (db.global_challenges, [challenge]),
+            (db.global_submissions, global_submissions), (db.global_votes, votes),
+        ):
+            if docs:
+                await collection.insert_many([dict(doc) for doc in docs])
+
+        await backfill_follow_counts(db)
+        return {
+            "users": len(self.users), "groups": len(groups), "follows": len(follows),
+            "submissions": len(submissions), "global_submissions": len(global_submissions), "votes": len(votes),
+        }
+
+    async def run(self, name: str, recorder: Recorder) -> Dict[str, Any]:
+        scenario = getattr(self, f"scenario_{name}")
+        started = time.perf_counter()
+        await asyncio.gather(*(scenario(recorder, worker) for worker in range(self.args.concurrency)))
+        elapsed = time.perf_counter() - started
+        return {"elapsed_s": round(elapsed, 3), "endpoints": recorder.report(elapsed)}
+
+    async def scenario_login(self, recorder: Recorder, worker: int):
+        """Log in, then resolve the session through /api/me"""
+        for _ in range(self.args.iterations):
+            user = self.random.choice(self.users)
+            response = await recorder.call(self.client, "POST", "POST /api/login", "/api/login",
+                                           json={"username": user["username"], "password": PASSWORD})
+            session_id = response.json().get("session_id")
+            if session_id:
+                await recorder.call(self.client, "GET", "GET /api/me", "/api/me",
+                                    headers={"Authorization": f"Bearer {session_id}"})
+
+    async def scenario_feed(self, recorder: Recorder, worker: int):
+        """Scroll the group activity feed and the friends-only global feed"""
+        participants = self.users[:len(self.submission_ids)] or self.users
+        for _ in range(self.args.iterations):
+            user = self.random.choice(participants)
+            cursor = None
+            for _ in range(self.args.pages):
+                params = {"user_id": user["id"], "limit": 20}
+                if cursor:
+                    params["cursor"] = cursor
+                response = await recorder.call(self.client, "GET", "GET /api/submissions/feed",
+                                               "/api/submissions/feed", params=params)
+                cursor = response.headers.get("X-Next-Cursor")
+                if not cursor:
+                    break
+
+            cursor = None
+            for _ in range(self.args.pages):
+                params = {"user_id": user["id"], "limit": 20, "friends_only": self.random.random() < 0.5}
+                if cursor:
+                    params["cursor"] = cursor
+                response = await recorder.call(self.client, "GET", "GET /api/global-feed",
+                                               "/api/global-feed", params=params)
+                cursor = response.json().get("next_cursor")
+                if not cursor:
+                    break
+
+    async def scenario_votes(self, recorder: Recorder, worker: int):
+        """Many users toggling votes on a handful of hot submissions"""
+        hot = self.submission_ids[:5]
+        if not hot:
+            return
+        for _ in range(self.args.iterations):
+            user = self.random.choice(self.users)
+            submission_id = self.random.choice(hot)
+            await recorder.call(self.client, "POST", "POST /api/global-submissions/{id}/vote",
+                                f"/api/global-submissions/{submission_id}/vote", data={"user_id": user["id"]})
+
+    async def scenario_drop(self, recorder: Recorder, worker: int):
+        """A new challenge drops: everyone reads it, submits and opens the feed"""
+        if worker == 0:
+            response = await recorder.call(self.client, "POST", "POST /api/global-challenges", "/api/global-challenges",
+                                           data={"prompt": "Benchmark drop", "duration_hours": 1})
+            self.drop_challenge_id = response.json()["id"]
+        while not getattr(self, "drop_challenge_id", None):
+            await asyncio.sleep(0.001)
+
+        users = self.users[worker::self.args.concurrency][:self.args.iterations]
+        for user in users:
+            await recorder.call(self.client, "GET", "GET /api/global-challenges/current", "/api/global-challenges/current")
+            await recorder.call(self.client, "POST", "POST /api/global-submissions", "/api/global-submissions",
+                                data={"challenge_id": self.drop_challenge_id, "description": "drop", "user_id": user["id"]})
+            await recorder.call(self.client, "GET", "GET /api/global-feed", "/api/global-feed",
+                                params={"user_id": user["id"], "limit": 20})
+
+
+async def main(args) -> Dict[str, Any]:
+    temp_dir = tempfile.TemporaryDirectory(prefix="actify-bench-")
+    os.environ["DB_NAME"] = f"actify_bench_{uuid.uuid4().hex[:8]}"
+    os.environ["BLOB_STORE_PATH"] = str(Path(temp_dir.name) / "media")
+    os.environ.pop("SESSION_CACHE_URL", None)
+    if args.mongo_url:
+        os.environ["MONGO_URL"] = args.mongo_url
+    else:
+        import motor.motor_asyncio
+        os.environ["MONGO_URL"] = "mongodb://benchmark.invalid:27017"
+        motor.motor_asyncio.AsyncIOMotorClient = AsyncMongoMockClient
+
+    sys.path.insert(0, str(Path(__file__).parent))
+    import server
+
+    logging.getLogger().setLevel(logging.WARNING)
+    benchmark = Benchmark(server, args)
+    started = time.perf_counter()
+    seeded = await benchmark.seed()
+    await server.app.router.startup()
+    report = {
+        "started_at": datetime.utcnow().isoformat(),
+        "config": {key: value for key, value in vars(args).items() if key != "output"},
+        "seed": dict(seeded, elapsed_s=round(time.perf_counter() - started, 3)),
+        "scenarios": {},
+    }
+    transport = httpx.ASGITransport(app=server.app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+            benchmark.client = client
+            for name in args.scenarios:
+                report["scenarios"][name] = await benchmark.run(name, Recorder())
+    finally:
+        await server.app.router.shutdown()
+        if args.mongo_url:
+            await server.client.drop_database(os.environ["DB_NAME"])
+        temp_dir.cleanup()
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the ACTIFY API against a seeded database")
+    parser.add_argument("--mongo-url", help="real MongoDB to use instead of the in-memory stand-in")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--groups", type=int, default=20)
+    parser.add_argument("--group-size", type=int, default=MAX_GROUP_MEMBERS,
+                        help=f"members per seeded group (at most {MAX_GROUP_MEMBERS})")
+    parser.add_argument("--follows-per-user", type=int, default=20)
+    parser.add_argument("--submissions-per-group", type=int, default=50)
+    parser.add_argument("--participation", type=float, default=0.5, help="share of users in the seeded challenge")
+    parser.add_argument("--votes-per-submission", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=20, help="concurrent virtual users per scenario")
+    parser.add_argument("--iterations", type=int, default=10, help="iterations per virtual user")
+    parser.add_argument("--pages", type=int, default=3, help="pages scrolled per feed visit")
+    parser.add_argument("--seed", type=int, default=1, help="random seed for reproducible data")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    if not 1 <= args.group_size <= MAX_GROUP_MEMBERS:
+        parser.error(f"--group-size must be between 1 and {MAX_GROUP_MEMBERS}")
+    if httpx is None:
+        parser.error("the benchmark needs httpx: pip install httpx")
+    if not args.mongo_url and AsyncMongoMockClient is None:
+        parser.error("the in-memory stand-in needs mongomock-motor (pip install mongomock-motor), or pass --mongo-url")
+
+    result = json.dumps(asyncio.run(main(args)), indent=2)
+    if args.output:
+        Path(args.output).write_text(result + "\n")
+    else:
+        print(result)
@@ -0,0 +1,155 @@
+"""Content-addressed blob storage for uploaded photos and completion proofs.
+
+Blobs are keyed by the SHA-256 of their bytes, so identical uploads are
+stored once. MongoDB documents only keep the reference returned by
+``BlobInfo.to_ref`` and clients fetch the bytes from ``GET /api/media/{hash}``.
+``put_stream`` hashes and writes a blob chunk by chunk, so large uploads are
+never held in memory.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import re
+import uuid
+from abc import ABC, abstractmethod
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import AsyncIterable, AsyncIterator, Dict, Optional
+
+BLOB_HASH_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+DEFAULT_CHUNK_SIZE = 256 * 1024
+
+
+@dataclass(frozen=True)
+class BlobInfo:
+    hash: str
+    size: int
+    content_type: str
+
+    @property
+    def url(self) -> str:
+        return f"/api/media/{self.hash}"
+
+    def to_ref(self) -> Dict:
+        return asdict(self)
+
+
+def is_blob_hash(value: str) -> bool:
+    return bool(BLOB_HASH_PATTERN.match(value))
+
+
+def _hash_and_write(digest, f, chunk: bytes):
+    # hashlib releases the GIL on large buffers, so both run off the event loop
+    digest.update(chunk)
+    f.write(chunk)
+
+
+class BlobStore(ABC):
+    """Interface every blob store backend implements"""
+
+    async def put(self, data: bytes, content_type: str) -> BlobInfo:
+        async def single_chunk():
+            yield data
+        return await self.put_stream(single_chunk(), content_type)
+
+    @abstractmethod
+    async def put_stream(self, chunks: AsyncIterable[bytes], content_type: str) -> BlobInfo:
+        """Store a blob from an async stream of chunks; nothing is kept if the stream raises"""
+
+    @abstractmethod
+    async def stat(self, blob_hash: str) -> Optional[BlobInfo]:
+        """Metadata of a stored blob, or None if it does not exist"""
+
+    @abstractmethod
+    def iter_chunks(self, blob_hash: str) -> AsyncIterator[bytes]:
+        """Stream a stored blob's bytes"""
+
+
+class LocalBlobStore(BlobStore):
+    """Stores each blob as a file under root/<aa>/<bb>/<hash> with a JSON sidecar"""
+
+    def __init__(self, root: Path, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        self.root = Path(root)
+        self.chunk_size = chunk_size
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, blob_hash: str) -> Path:
+        return self.root / blob_hash[:2] / blob_hash[2:4] / blob_hash
+
+    def _meta_path(self, blob_hash: str) -> Path:
+        return self._path(blob_hash).with_suffix(".json")
+
+    def _commit(self, tmp_path: Path, info: BlobInfo) -> BlobInfo:
+        path = self._path(info.hash)
+        if path.exists():
+            # Deduplicated: the bytes are already stored under this hash
+            tmp_path.unlink()
+            return self._read_meta(info.hash) or info
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._meta_path(info.hash).write_text(json.dumps(info.to_ref()))
+        os.replace(tmp_path, path)
+        return info
+
+    def _read_meta(self, blob_hash: str) -> Optional[BlobInfo]:
+        try:
+            return BlobInfo(**json.loads(self._meta_path(blob_hash).read_text()))
+        except FileNotFoundError:
+            return None
+
+    async def put_stream(self, chunks: AsyncIterable[bytes], content_type: str) -> BlobInfo:
+        # The hash is only known at the end, so stream into a temp file on the same filesystem
+        tmp_path = self.root / f".incoming-{uuid.uuid4().hex}.tmp"
+        digest = hashlib.sha256()
+        size = 0
+        f = await asyncio.to_thread(open, tmp_path, "wb")
+        try:
+            try:
+                async for chunk in chunks:
+                    size += len(chunk)
+                    await asyncio.to_thread(_hash_and_write, digest, f, chunk)
+            finally:
+                await asyncio.to_thread(f.close)
+            info = BlobInfo(hash=digest.hexdigest(), size=size, content_type=content_type)
+            return await asyncio.to_thread(self._commit, tmp_path, info)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+
+    async def stat(self, blob_hash: str) -> Optional[BlobInfo]:
+        if not is_blob_hash(blob_hash) or not self._path(blob_hash).exists():
+            return None
+        return await asyncio.to_thread(self._read_meta, blob_hash)
+
+    async def iter_chunks(self, blob_hash: str) -> AsyncIterator[bytes]:
+        f = await asyncio.to_thread(open, self._path(blob_hash), "rb")
+        try:
+            while True:
+                chunk = await asyncio.to_thread(f.read, self.chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            f.close()
+
+
+BLOB_STORE_BACKENDS = {
+    "local": LocalBlobStore,
+}
+
+
+def create_blob_store(backend: str, **options) -> BlobStore:
+    try:
+        store_class = BLOB_STORE_BACKENDS[backend]
+    except KeyError:
+        raise ValueError(f"Unknown blob store backend: {backend}")
+    return store_class(**options)
+
+
+def blob_store_from_env(default_root: Path) -> BlobStore:
+    """The blob store configured by BLOB_STORE_BACKEND and BLOB_STORE_PATH"""
+    return create_blob_store(
+        os.environ.get("BLOB_STORE_BACKEND", "local"),
+        root=Path(os.environ.get("BLOB_STORE_PATH", default_root))
+    )
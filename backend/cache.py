@@ -0,0 +1,95 @@
+"""In-process caches for hot, rarely changing reads.
+
+``TTLCache`` is a small LRU with per-entry expiry used as the building block.
+``ActiveChallengeCache`` keeps the current global challenge in memory: the
+write paths that change it call ``invalidate`` and the TTL bounds how stale
+another worker process can be. Given an ``encode`` function it also keeps the
+challenge's JSON encoding, computed once per cached document.
+"""
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+_MISSING = object()
+
+
+class TTLCache:
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0, timer: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.timer = timer
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            return default
+        expires_at, value = entry
+        if expires_at <= self.timer():
+            del self._entries[key]
+            return default
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        self._entries[key] = (self.timer() + (self.ttl if ttl is None else ttl), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._entries.pop(key, None)
+        return default if entry is None else entry[1]
+
+    def clear(self):
+        self._entries.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class ActiveChallengeCache:
+    """Caches the most recent active global challenge, including "no challenge\""""
+
+    def __init__(self, collection, ttl: float = 30.0, encode: Optional[Callable[[Dict[str, Any]], bytes]] = None):
+        self.collection = collection
+        self.encode = encode
+        self._cache = TTLCache(maxsize=1, ttl=ttl)
+        self._lock = asyncio.Lock()
+        self._generation = 0
+        self._encoded: Optional[Tuple[Dict[str, Any], bytes]] = None
+
+    async def get(self) -> Optional[Dict[str, Any]]:
+        challenge = self._cache.get("active", _MISSING)
+        if challenge is not _MISSING:
+            return challenge
+
+        # Single flight: concurrent misses wait for one query
+        async with self._lock:
+            challenge = self._cache.get("active", _MISSING)
+            if challenge is not _MISSING:
+                return challenge
+
+            generation = self._generation
+            challenge = await self.collection.find_one({"is_active": True}, sort=[("created_at", -1)])
+            if generation == self._generation:
+                self._cache.set("active", challenge)
+            return challenge
+
+    async def get_encoded(self) -> Tuple[Optional[Dict[str, Any]], Optional[bytes]]:
+        """The active challenge and its encoding, re-encoded only when the cached document changes"""
+        challenge = await self.get()
+        if challenge is None:
+            return None, None
+        if self._encoded is None or self._encoded[0] is not challenge:
+            self._encoded = (challenge, self.encode(challenge))
+        return challenge, self._encoded[1]
+
+    def invalidate(self):
+        self._generation += 1
+        self._cache.clear()
+        self._encoded = None
@@ -0,0 +1,77 @@
+"""Global submission comments stored in their own collection.
+
+Each comment is a document in ``global_comments``. The submission keeps a
+denormalized ``comment_count`` and only its most recent comments in
+``comments``, so the feed's read cost no longer grows with comment volume.
+The full thread is paginated from the collection. Submissions written before
+the collection existed are migrated on their first new comment.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo import UpdateOne
+
+from pagination import fetch_page
+
+RECENT_COMMENTS = 3
+
+
+class CommentStore:
+    def __init__(self, comments_collection, submissions_collection):
+        self.comments = comments_collection
+        self.submissions = submissions_collection
+
+    async def add(self, submission_id: str, comment: Dict[str, Any]) -> bool:
+        """Store a comment; returns False if the submission does not exist"""
+        update = {
+            "$inc": {"comment_count": 1},
+            "$push": {"comments": {"$each": [dict(comment)], "$slice": -RECENT_COMMENTS}}
+        }
+        # Only migrated submissions are updated, so the slice never drops legacy embedded comments
+        result = await self.submissions.update_one({"id": submission_id, "comment_count": {"$exists": True}}, update)
+        if result.matched_count == 0:
+            legacy = await self.submissions.find_one(
+                {"id": submission_id, "comment_count": {"$exists": False}}, {"_id": 1, "id": 1, "comments": 1}
+            )
+            if legacy is None:
+                return False
+            await _move_embedded_comments(self.comments, self.submissions, legacy)
+            result = await self.submissions.update_one({"id": submission_id}, update)
+            if result.matched_count == 0:
+                return False
+        await self.comments.insert_one({**comment, "submission_id": submission_id})
+        return True
+
+    async def page(
+        self, submission_id: str, limit: int, cursor: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        return await fetch_page(self.comments, {"submission_id": submission_id}, limit, cursor, {"_id": 0})
+
+
+async def _move_embedded_comments(comments_collection, submissions_collection, submission: Dict[str, Any]):
+    comments = submission.get("comments") or []
+    if comments:
+        await comments_collection.bulk_write([
+            UpdateOne(
+                {"id": comment["id"]},
+                {"$setOnInsert": {**comment, "submission_id": submission["id"]}},
+                upsert=True
+            )
+            for comment in comments
+        ], ordered=False)
+    # Conditional so a concurrent migration of the same submission cannot reset a newer count
+    await submissions_collection.update_one(
+        {"_id": submission["_id"], "comment_count": {"$exists": False}},
+        {"$set": {"comment_count": len(comments), "comments": comments[-RECENT_COMMENTS:]}}
+    )
+
+
+async def migrate_embedded_comments(db, batch_size: int = 200) -> int:
+    """Move comments embedded in global_submissions into global_comments"""
+    migrated = 0
+    cursor = db.global_submissions.find(
+        {"comment_count": {"$exists": False}}, {"_id": 1, "id": 1, "comments": 1}
+    ).batch_size(batch_size)
+    async for submission in cursor:
+        await _move_embedded_comments(db.global_comments, db.global_submissions, submission)
+        migrated += 1
+    return migrated
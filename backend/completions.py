@@ -0,0 +1,122 @@
+"""Daily activity completions.
+
+Completion order decides points: 3 for the first member to finish an
+activity, 2 for the second, 1 for the third, and 0 for everyone after that.
+``CompletionEngine`` hands out orders from one ``db.activity_sequences``
+document per activity. A single ``find_one_and_update`` increments the
+sequence and pushes the user onto ``completed_by``, and its ``$ne`` filter
+rejects a repeat completion, so near-simultaneous completions never share an
+order. The first completion creates the sequence with a plain insert; a
+concurrent first completion that loses that insert retries the update.
+
+The proof is validated and stored before an order is claimed, so a rejected
+upload never holds a slot; blobs are content-addressed, so the proof of a
+repeat completion costs little. If recording the completion fails, the user is
+released from ``completed_by`` but the count is left alone: others may already
+hold later orders, so the released order stays a gap instead of being handed
+out twice. The unique ``(activity_submission_id, completed_by)`` index on the
+completions themselves is the backstop.
+"""
+import uuid
+from datetime import datetime
+from typing import Any, Dict
+
+from fastapi import HTTPException
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from blob_store import BlobInfo
+
+POINTS_BY_ORDER = {1: 3, 2: 2, 3: 1}
+
+
+def points_for(completion_order: int) -> int:
+    return POINTS_BY_ORDER.get(completion_order, 0)
+
+
+class CompletionEngine:
+    def __init__(self, completions, sequences):
+        self.completions = completions
+        self.sequences = sequences
+
+    async def complete(
+        self,
+        group_id: str,
+        activity_submission_id: str,
+        user_id: str,
+        proof: BlobInfo,
+        description: str
+    ) -> Dict[str, Any]:
+        """Claim the next order for the activity and record the completion with its points"""
+        completion_order = await self._claim(group_id, activity_submission_id, user_id)
+        completion_doc = {
+            "id": str(uuid.uuid4()),
+            "group_id": group_id,
+            "activity_submission_id": activity_submission_id,
+            "completed_by": user_id,
+            "completion_proof_url": proof.url,
+            "completion_proof": proof.to_ref(),
+            "completion_description": description,
+            "completed_at": datetime.utcnow(),
+            "day_of_week": completion_order,  # Simplified
+            "completion_order": completion_order,
+            "points_earned": points_for(completion_order)
+        }
+        try:
+            await self.completions.insert_one(completion_doc)
+        except Exception as error:
+            await self._release(activity_submission_id, user_id)
+            if isinstance(error, DuplicateKeyError):
+                raise HTTPException(status_code=400, detail="Activity already completed by user")
+            raise
+        return completion_doc
+
+    async def _claim(self, group_id: str, activity_submission_id: str, user_id: str) -> int:
+        sequence = await self._next_order(activity_submission_id, user_id)
+        if sequence is None:
+            try:
+                await self.sequences.insert_one(
+                    {"_id": activity_submission_id, "group_id": group_id, "count": 1, "completed_by": [user_id]}
+                )
+                return 1
+            except DuplicateKeyError:
+                # Created by a concurrent first completion, or it already lists the user; the retry tells which
+                sequence = await self._next_order(activity_submission_id, user_id)
+        if sequence is None:
+            raise HTTPException(status_code=400, detail="Activity already completed by user")
+        return sequence["count"]
+
+    async def _next_order(self, activity_submission_id: str, user_id: str):
+        return await self.sequences.find_one_and_update(
+            {"_id": activity_submission_id, "completed_by": {"$ne": user_id}},
+            {"$inc": {"count": 1}, "$push": {"completed_by": user_id}},
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def _release(self, activity_submission_id: str, user_id: str):
+        await self.sequences.update_one(
+            {"_id": activity_submission_id, "completed_by": user_id},
+            {"$pull": {"completed_by": user_id}}
+        )
+
+
+async def backfill_activity_sequences(db) -> int:
+    """Build db.activity_sequences from completions recorded before the sequences existed"""
+    pipeline = [{"$group": {
+        "_id": "$activity_submission_id",
+        "group_id": {"$first": "$group_id"},
+        "count": {"$sum": 1},
+        "completed_by": {"$addToSet": "$completed_by"}
+    }}]
+    batch = [
+        UpdateOne(
+            {"_id": row["_id"]},
+            {"$set": {"group_id": row["group_id"], "count": row["count"], "completed_by": row["completed_by"]}},
+            upsert=True
+        )
+        async for row in db.daily_activity_completions.aggregate(pipeline)
+    ]
+    if not batch:
+        return 0
+    result = await db.activity_sequences.bulk_write(batch, ordered=False)
+    return result.upserted_count + result.modified_count
@@ -0,0 +1,57 @@
+"""Per-challenge participation counters.
+
+``db.challenge_counters`` holds one document per global challenge, keyed by
+the challenge id and incremented after every new submission, so participant
+totals are a point read instead of a ``count_documents`` over the challenge's
+submissions. Reads go through a short TTL cache. Counters start at zero when
+their challenge is created, so a submission is only ever a plain ``$inc``;
+challenges that predate this collection are seeded once by a migration.
+"""
+from pymongo import UpdateOne
+
+from cache import TTLCache
+
+
+class ChallengeCounters:
+    def __init__(self, counters, submissions, ttl: float = 5.0, maxsize: int = 1024):
+        self.counters = counters
+        self.submissions = submissions
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    async def create(self, *challenge_ids: str):
+        """Start counters at zero; call before the challenges are inserted so no submission misses one"""
+        if challenge_ids:
+            await self.counters.insert_many([{"_id": challenge_id, "participants": 0} for challenge_id in challenge_ids])
+
+    async def participants(self, challenge_id: str) -> int:
+        count = self._cache.get(challenge_id)
+        if count is None:
+            counter = await self.counters.find_one({"_id": challenge_id})
+            if counter:
+                count = counter["participants"]
+            else:
+                # Not migrated yet; count without seeding so concurrent submissions are never counted twice
+                count = await self.submissions.count_documents({"challenge_id": challenge_id})
+            self._cache.set(challenge_id, count)
+        return count
+
+    async def increment(self, challenge_id: str):
+        """Count a new submission; call after it has been inserted"""
+        await self.counters.update_one({"_id": challenge_id}, {"$inc": {"participants": 1}})
+        count = self._cache.get(challenge_id)
+        if count is not None:
+            self._cache.set(challenge_id, count + 1)
+
+
+async def seed_challenge_counters(db) -> int:
+    """Create counters for challenges that predate db.challenge_counters"""
+    pipeline = [{"$group": {"_id": "$challenge_id", "count": {"$sum": 1}}}]
+    counts = {row["_id"]: row["count"] async for row in db.global_submissions.aggregate(pipeline)}
+    batch = [
+        UpdateOne({"_id": challenge["id"]}, {"$max": {"participants": counts.get(challenge["id"], 0)}}, upsert=True)
+        async for challenge in db.global_challenges.find({}, {"_id": 0, "id": 1})
+    ]
+    if not batch:
+        return 0
+    result = await db.challenge_counters.bulk_write(batch, ordered=False)
+    return result.upserted_count + result.modified_count
@@ -0,0 +1,100 @@
+"""Cached follow graph.
+
+``FollowGraph`` owns every write to ``db.follows``. Each user's follower and
+following ids are cached as frozensets, so friends-only feeds and follower
+listings start from an in-memory lookup instead of reading every follow
+document. Follows and unfollows update the cached sets of the process that
+served them and maintain ``stats.followers_count`` / ``stats.following_count``
+on the user documents; the TTL bounds how stale other worker processes can be.
+"""
+import uuid
+from datetime import datetime
+from typing import FrozenSet, Optional
+
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from cache import TTLCache
+
+
+class FollowGraph:
+    def __init__(self, follows, users, ttl: float = 300.0, maxsize: int = 10000):
+        self.follows = follows
+        self.users = users
+        self._following = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._followers = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    async def following(self, user_id: str) -> FrozenSet[str]:
+        """Ids of the users user_id follows"""
+        ids = self._following.get(user_id)
+        if ids is None:
+            ids = frozenset(await self.follows.distinct("following_id", {"follower_id": user_id}))
+            self._following.set(user_id, ids)
+        return ids
+
+    async def followers(self, user_id: str) -> FrozenSet[str]:
+        """Ids of the users following user_id"""
+        ids = self._followers.get(user_id)
+        if ids is None:
+            ids = frozenset(await self.follows.distinct("follower_id", {"following_id": user_id}))
+            self._followers.set(user_id, ids)
+        return ids
+
+    async def is_following(self, follower_id: str, user_id: str) -> bool:
+        ids = self._following.get(follower_id)
+        if ids is not None:
+            return user_id in ids
+        return await self.follows.find_one({"follower_id": follower_id, "following_id": user_id}, {"_id": 1}) is not None
+
+    async def follow(self, follower_id: str, user_id: str) -> bool:
+        """Record a follow; returns False if it already existed"""
+        try:
+            await self.follows.insert_one({
+                "id": str(uuid.uuid4()),
+                "follower_id": follower_id,
+                "following_id": user_id,
+                "created_at": datetime.utcnow()
+            })
+        except DuplicateKeyError:
+            return False
+
+        await self._update_counts(follower_id, user_id, 1)
+        self._write_through(follower_id, user_id, add=True)
+        return True
+
+    async def unfollow(self, follower_id: str, user_id: str) -> bool:
+        """Remove a follow; returns False if there was none"""
+        result = await self.follows.delete_one({"follower_id": follower_id, "following_id": user_id})
+        if result.deleted_count == 0:
+            return False
+
+        await self._update_counts(follower_id, user_id, -1)
+        self._write_through(follower_id, user_id, add=False)
+        return True
+
+    async def _update_counts(self, follower_id: str, user_id: str, delta: int):
+        await self.users.update_one({"id": follower_id}, {"$inc": {"stats.following_count": delta}})
+        await self.users.update_one({"id": user_id}, {"$inc": {"stats.followers_count": delta}})
+
+    def _write_through(self, follower_id: str, user_id: str, add: bool):
+        # Only sets that are already cached are updated; the rest load fresh on next use
+        for cache, key, member in ((self._following, follower_id, user_id), (self._followers, user_id, follower_id)):
+            ids: Optional[FrozenSet[str]] = cache.get(key)
+            if ids is not None:
+                cache.set(key, (ids | {member}) if add else (ids - {member}))
+
+
+async def backfill_follow_counts(db) -> int:
+    """Recompute stats.followers_count and stats.following_count from db.follows"""
+    await db.users.update_many({}, {"$set": {"stats.followers_count": 0, "stats.following_count": 0}})
+    updated = 0
+    for group_field, counter in (("following_id", "stats.followers_count"), ("follower_id", "stats.following_count")):
+        pipeline = [{"$group": {"_id": f"${group_field}", "count": {"$sum": 1}}}]
+        batch = [
+            UpdateOne({"id": row["_id"]}, {"$set": {counter: row["count"]}})
+            async for row in db.follows.aggregate(pipeline)
+        ]
+        if batch:
+            result = await db.users.bulk_write(batch, ordered=False)
+            updated += result.modified_count
+    return updated
@@ -0,0 +1,238 @@
+"""Declarative MongoDB index registry for the ACTIFY API.
+
+Every collection that server.py queries registers the indexes its access
+patterns need here. ``ensure_indexes`` applies the registry at startup and
+``index_plan`` reports what would be applied without touching the database:
+
+    python indexes.py            # print the index plan as JSON
+    python indexes.py --apply    # create the indexes against MONGO_URL/DB_NAME
+"""
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class IndexSpec:
+    collection: str
+    keys: Tuple[Tuple[str, int], ...]
+    name: str
+    unique: bool = False
+    sparse: bool = False
+    expire_after_seconds: Optional[int] = None
+    reason: str = ""
+    options: Dict[str, Any] = field(default_factory=dict)
+
+    def to_model(self) -> IndexModel:
+        kwargs = dict(self.options)
+        kwargs["name"] = self.name
+        if self.unique:
+            kwargs["unique"] = True
+        if self.sparse:
+            kwargs["sparse"] = True
+        if self.expire_after_seconds is not None:
+            kwargs["expireAfterSeconds"] = self.expire_after_seconds
+        return IndexModel(list(self.keys), **kwargs)
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "collection": self.collection,
+            "name": self.name,
+            "keys": [list(key) for key in self.keys],
+            "unique": self.unique,
+            "sparse": self.sparse,
+            "expire_after_seconds": self.expire_after_seconds,
+            "reason": self.reason,
+        }
+
+
+INDEX_REGISTRY: List[IndexSpec] = []
+
+# IndexOptionsConflict / IndexKeySpecsConflict: an index changed since it was created
+INDEX_CONFLICT_CODES = (85, 86)
+
+
+def register_index(collection: str, keys, name: str, **kwargs) -> IndexSpec:
+    """Add an index to the registry; keys is a list of (field, direction) pairs"""
+    spec = IndexSpec(collection=collection, keys=tuple(tuple(key) for key in keys), name=name, **kwargs)
+    INDEX_REGISTRY.append(spec)
+    return spec
+
+
+# users
+register_index("users", [("id", ASCENDING)], "users_id_unique", unique=True,
+               reason="find_one({'id': ...}) on every user lookup")
+register_index("users", [("username", ASCENDING)], "users_username_unique", unique=True,
+               reason="login and duplicate check on create_user")
+register_index("users", [("email", ASCENDING)], "users_email_unique", unique=True,
+               reason="duplicate check on create_user")
+register_index("users", [("search_prefixes", ASCENDING)], "users_search_prefixes",
+               reason="type-ahead search_users")
+
+# sessions
+register_index("sessions", [("session_id", ASCENDING)], "sessions_session_id_unique", unique=True,
+               reason="bearer session lookup")
+register_index("sessions", [("expires_at", ASCENDING)], "sessions_expires_at_ttl", expire_after_seconds=0,
+               reason="let MongoDB drop expired sessions")
+
+# groups
+register_index("groups", [("id", ASCENDING)], "groups_id_unique", unique=True,
+               reason="find_one({'id': ...}) in every group handler")
+register_index("groups", [("invite_code", ASCENDING)], "groups_invite_code_unique", unique=True,
+               reason="invite code uniqueness check and join-by-code")
+register_index("groups", [("members", ASCENDING)], "groups_members",
+               reason="get_user_groups")
+register_index("groups", [("is_public", ASCENDING), ("created_at", DESCENDING)], "groups_public_created",
+               reason="get_groups")
+
+# submissions
+register_index("submissions", [("id", ASCENDING)], "submissions_id_unique", unique=True,
+               reason="submission lookup by id")
+register_index("submissions", [("group_id", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)],
+               "submissions_group_created_id",
+               reason="keyset pages of get_group_submissions and get_activity_feed")
+
+# notifications
+register_index("notifications", [("id", ASCENDING)], "notifications_id_unique", unique=True,
+               reason="mark_notification_read")
+register_index("notifications", [("user_id", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)],
+               "notifications_user_created_id",
+               reason="keyset pages of get_notifications")
+
+# weekly activity challenge
+register_index("weekly_activity_submissions", [("group_id", ASCENDING), ("week_start", ASCENDING)],
+               "weekly_activity_submissions_group_week",
+               reason="get_weekly_activities and reveal_daily_activity")
+register_index("weekly_activity_submissions", [("id", ASCENDING)], "weekly_activity_submissions_id_unique",
+               unique=True, reason="marking an activity as revealed")
+register_index("daily_activity_completions", [("activity_submission_id", ASCENDING), ("completed_by", ASCENDING)],
+               "daily_activity_completions_activity_user_unique", unique=True,
+               reason="one completion per member and activity in CompletionEngine")
+
+# global challenges
+register_index("global_challenges", [("id", ASCENDING)], "global_challenges_id_unique", unique=True,
+               reason="challenge lookup by id")
+register_index("global_challenges", [("is_active", ASCENDING), ("created_at", DESCENDING)],
+               "global_challenges_active_created",
+               reason="current active challenge")
+register_index("global_challenges", [("expires_at", ASCENDING)], "global_challenges_expires_at",
+               reason="challenge scheduler reload of pending challenges")
+register_index("global_submissions", [("id", ASCENDING)], "global_submissions_id_unique", unique=True,
+               reason="vote and comment lookups")
+register_index("global_submissions", [("challenge_id", ASCENDING), ("user_id", ASCENDING)],
+               "global_submissions_challenge_user_unique", unique=True,
+               reason="one submission per user per challenge; feed unlock check")
+register_index("global_submissions", [("challenge_id", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)],
+               "global_submissions_challenge_created_id",
+               reason="keyset pages of get_global_feed")
+register_index("global_votes", [("submission_id", ASCENDING), ("user_id", ASCENDING)],
+               "global_votes_submission_user_unique", unique=True,
+               reason="one vote per user per submission; vote toggle relies on duplicate key errors")
+register_index("global_comments", [("id", ASCENDING)], "global_comments_id_unique", unique=True,
+               reason="idempotent comment migration")
+register_index("global_comments", [("submission_id", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)],
+               "global_comments_submission_created_id",
+               reason="keyset pages of get_submission_comments")
+
+# follows
+register_index("follows", [("follower_id", ASCENDING), ("following_id", ASCENDING)],
+               "follows_follower_following_unique", unique=True,
+               reason="get_following, follow status and duplicate follow check")
+register_index("follows", [("following_id", ASCENDING)], "follows_following",
+               reason="get_followers")
+
+# leaderboards
+register_index("leaderboard_alltime", [("user_id", ASCENDING)], "leaderboard_alltime_user_unique", unique=True,
+               reason="incremental all-time counters")
+register_index("leaderboard_alltime", [("count", DESCENDING)], "leaderboard_alltime_count",
+               reason="top N all-time rankings")
+register_index("leaderboard_daily", [("day", ASCENDING), ("user_id", ASCENDING)], "leaderboard_daily_day_user_unique",
+               unique=True, reason="per-user per-day buckets")
+register_index("leaderboard_weekly", [("window", ASCENDING), ("user_id", ASCENDING)],
+               "leaderboard_weekly_window_user_unique", unique=True,
+               reason="incremental weekly counters")
+register_index("leaderboard_weekly", [("window", ASCENDING), ("count", DESCENDING)],
+               "leaderboard_weekly_window_count",
+               reason="top N weekly rankings")
+
+
+def index_plan(collection: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Describe the indexes ensure_indexes would apply"""
+    return [spec.describe() for spec in INDEX_REGISTRY if collection is None or spec.collection == collection]
+
+
+async def ensure_indexes(db) -> Dict[str, List[str]]:
+    """Create every registered index, one create_indexes call per collection.
+
+    Indexes whose registered name or options changed are dropped and
+    recreated. Other failures (e.g. duplicate data blocking a unique index)
+    are logged and do not stop the remaining collections from being indexed.
+    """
+    by_collection: Dict[str, List[IndexSpec]] = {}
+    for spec in INDEX_REGISTRY:
+        by_collection.setdefault(spec.collection, []).append(spec)
+
+    created: Dict[str, List[str]] = {}
+    for collection, specs in by_collection.items():
+        try:
+            created[collection] = await db[collection].create_indexes([spec.to_model() for spec in specs])
+        except OperationFailure as e:
+            if e.code not in INDEX_CONFLICT_CODES:
+                logger.error("Failed to create indexes on %s: %s", collection, e)
+                continue
+            created[collection] = await _replace_conflicting(db[collection], specs)
+    return created
+
+
+async def _replace_conflicting(collection, specs: List[IndexSpec]) -> List[str]:
+    """Create specs one by one, replacing existing indexes whose name or options changed"""
+    existing = await collection.index_information()
+    created = []
+    for spec in specs:
+        for name, info in existing.items():
+            same_keys = [tuple(key) for key in info["key"]] == list(spec.keys)
+            if name != "_id_" and (name == spec.name or same_keys) and not _matches(info, spec):
+                logger.info("Replacing index %s on %s with %s", name, collection.name, spec.name)
+                await collection.drop_index(name)
+        try:
+            created.extend(await collection.create_indexes([spec.to_model()]))
+        except OperationFailure as e:
+            logger.error("Failed to create index %s on %s: %s", spec.name, collection.name, e)
+    return created
+
+
+def _matches(info: Dict[str, Any], spec: IndexSpec) -> bool:
+    return (
+        [tuple(key) for key in info["key"]] == list(spec.keys)
+        and bool(info.get("unique")) == spec.unique
+        and bool(info.get("sparse")) == spec.sparse
+        and info.get("expireAfterSeconds") == spec.expire_after_seconds
+    )
+
+
+if __name__ == "__main__":
+    import argparse
+    import asyncio
+    import json
+    import os
+    from pathlib import Path
+
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    parser = argparse.ArgumentParser(description="Report or apply the ACTIFY index plan")
+    parser.add_argument("--apply", action="store_true", help="create the indexes instead of printing the plan")
+    args = parser.parse_args()
+
+    if not args.apply:
+        print(json.dumps(index_plan(), indent=2))
+    else:
+        load_dotenv(Path(__file__).parent / '.env')
+        mongo_client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+        result = asyncio.run(ensure_indexes(mongo_client[os.environ['DB_NAME']]))
+        print(json.dumps(result, indent=2))
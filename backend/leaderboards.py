@@ -0,0 +1,191 @@
+"""Materialized activity leaderboards for /rankings/weekly and /rankings/alltime.
+
+Every submission write bumps three counters:
+
+* ``leaderboard_alltime``  one document per user with the lifetime count
+* ``leaderboard_daily``    one bucket per user per UTC day
+* ``leaderboard_weekly``   one document per user for the current 7-day window
+
+The weekly window is keyed by its last day. The first time a new day is
+seen, one process claims the new window and seeds it from the previous six
+daily buckets, which are small compared with the raw submissions; today's
+activity is counted live. Both endpoints then read the top N
+from a ``(window, count)`` / ``count`` index instead of aggregating the
+submission history.
+
+Rebuilds and the startup backfill only ever ``$inc``, so they never overwrite
+increments that land while they run.
+"""
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo import DESCENDING, UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+WEEKLY_WINDOW_DAYS = 7
+BACKFILL_MARKER = "backfill"
+
+
+def day_key(moment: datetime) -> str:
+    return moment.strftime("%Y-%m-%d")
+
+
+class Leaderboards:
+    def __init__(self, db):
+        self.alltime = db.leaderboard_alltime
+        self.daily = db.leaderboard_daily
+        self.weekly = db.leaderboard_weekly
+        self.meta = db.leaderboard_meta
+        self._current_window: Optional[str] = None
+
+    async def record_activity(self, user_id: str, username: str, at: Optional[datetime] = None):
+        """Count one activity for user_id in every leaderboard"""
+        at = at or datetime.utcnow()
+        window = await self._ensure_window(day_key(datetime.utcnow()))
+        update = {"$inc": {"count": 1}, "$set": {"username": username}}
+
+        await self.alltime.update_one({"user_id": user_id}, update, upsert=True)
+        await self.daily.update_one({"day": day_key(at), "user_id": user_id}, update, upsert=True)
+        await self.weekly.update_one({"window": window, "user_id": user_id}, update, upsert=True)
+
+    async def top_alltime(self, limit: int) -> List[Dict[str, Any]]:
+        return await self.alltime.find({}, {"_id": 0}).sort("count", DESCENDING).limit(limit).to_list(length=limit)
+
+    async def top_weekly(self, limit: int) -> List[Dict[str, Any]]:
+        window = await self._ensure_window(day_key(datetime.utcnow()))
+        return await self.weekly.find(
+            {"window": window}, {"_id": 0}
+        ).sort("count", DESCENDING).limit(limit).to_list(length=limit)
+
+    async def _ensure_window(self, window: str) -> str:
+        """Make sure the weekly counters for the window ending on `window` exist"""
+        if self._current_window == window:
+            return window
+
+        # Only one process rebuilds a window: the upsert collides on _id when
+        # another one has already moved the marker to this window
+        try:
+            await self.meta.find_one_and_update(
+                {"_id": "weekly", "window": {"$ne": window}},
+                {"$set": {"window": window, "rebuilt_at": datetime.utcnow()}},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            pass
+        else:
+            await self._rebuild_window(window)
+        self._current_window = window
+        return window
+
+    async def _rebuild_window(self, window: str):
+        # Days before today come from the daily buckets. Today's activity is
+        # counted live: record_activity only increments after the window is
+        # claimed, and $inc commutes with those concurrent increments where a
+        # $set would overwrite them
+        end = datetime.strptime(window, "%Y-%m-%d")
+        first_day = day_key(end - timedelta(days=WEEKLY_WINDOW_DAYS - 1))
+        totals = await self.daily.aggregate([
+            {"$match": {"day": {"$gte": first_day, "$lt": window}}},
+            {"$group": {"_id": "$user_id", "count": {"$sum": "$count"}, "username": {"$last": "$username"}}}
+        ]).to_list(length=None)
+
+        if totals:
+            await self.weekly.bulk_write([
+                UpdateOne(
+                    {"window": window, "user_id": total["_id"]},
+                    {"$inc": {"count": total["count"]}, "$setOnInsert": {"username": total["username"]}},
+                    upsert=True
+                )
+                for total in totals
+            ], ordered=False)
+        # Windows older than the current one are never read again
+        await self.weekly.delete_many({"window": {"$lt": window}})
+
+    async def backfill(self, source_collections, before: datetime):
+        """Add submissions created before `before` to the counters
+
+        Submissions created later are counted by record_activity, and every
+        write here is an $inc, so the backfill can run while the app serves traffic.
+        """
+        buckets: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        for collection in source_collections:
+            rows = await collection.aggregate([
+                {"$match": {"created_at": {"$lt": before}}},
+                {"$group": {
+                    "_id": {
+                        "user_id": "$user_id",
+                        "day": {"$dateToString": {"format": "%Y-%m-%d", "date": "$created_at"}}
+                    },
+                    "count": {"$sum": 1},
+                    "username": {"$last": "$username"}
+                }}
+            ]).to_list(length=None)
+            for row in rows:
+                bucket = buckets.setdefault(
+                    (row["_id"]["user_id"], row["_id"]["day"]), {"count": 0, "username": row["username"]}
+                )
+                bucket["count"] += row["count"]
+        if not buckets:
+            return
+
+        # Claim the current window first so its rebuild never sees the backfilled days
+        window = await self._ensure_window(day_key(datetime.utcnow()))
+        first_day = day_key(datetime.strptime(window, "%Y-%m-%d") - timedelta(days=WEEKLY_WINDOW_DAYS - 1))
+
+        await self.daily.bulk_write([
+            UpdateOne(
+                {"day": day, "user_id": user_id},
+                {"$inc": {"count": bucket["count"]}, "$setOnInsert": {"username": bucket["username"]}},
+                upsert=True
+            )
+            for (user_id, day), bucket in buckets.items()
+        ], ordered=False)
+
+        per_user: Dict[str, Dict[str, Any]] = {}
+        in_window: Dict[str, Dict[str, Any]] = {}
+        for (user_id, day), bucket in buckets.items():
+            per_user.setdefault(user_id, {"count": 0, "username": bucket["username"]})["count"] += bucket["count"]
+            if first_day <= day <= window:
+                in_window.setdefault(user_id, {"count": 0, "username": bucket["username"]})["count"] += bucket["count"]
+        for collection, key, totals in (
+            (self.alltime, {}, per_user),
+            (self.weekly, {"window": window}, in_window)
+        ):
+            if totals:
+                await collection.bulk_write([
+                    UpdateOne(
+                        {**key, "user_id": user_id},
+                        {"$inc": {"count": total["count"]}, "$setOnInsert": {"username": total["username"]}},
+                        upsert=True
+                    )
+                    for user_id, total in totals.items()
+                ], ordered=False)
+
+    async def rebuild_if_empty(self, source_collections):
+        """Backfill the counters the first time the app starts with existing submissions
+
+        Every worker calls this at startup, before it serves requests. Counters
+        that already hold data predate the backfill marker and are kept as they
+        are. Otherwise the first worker claims the marker, and its timestamp
+        precedes every live increment, so the backfill counts exactly the
+        submissions created before it.
+        """
+        if await self.alltime.find_one({}, {"_id": 1}):
+            return
+
+        started_at = datetime.utcnow()
+        try:
+            claim = await self.meta.update_one(
+                {"_id": BACKFILL_MARKER}, {"$setOnInsert": {"before": started_at}}, upsert=True
+            )
+        except DuplicateKeyError:
+            return
+        if claim.upserted_id is None:
+            return
+
+        logger.info("Backfilling leaderboards from existing submissions")
+        await self.backfill(source_collections, before=started_at)
+        await self.meta.update_one({"_id": BACKFILL_MARKER}, {"$set": {"finished_at": datetime.utcnow()}})
@@ -0,0 +1,53 @@
+"""Request-scoped batch loading of user profiles.
+
+``UserLoader`` works like a DataLoader: every ``load`` issued in the same
+event-loop tick is collected and resolved with one ``$in`` query, and each
+user id is fetched at most once per request. Handlers get a fresh loader
+through the ``get_user_loader`` dependency in server.py.
+"""
+import asyncio
+from typing import Any, Dict, Iterable, List, Optional
+
+USER_PROFILE_PROJECTION = {"_id": 0, "id": 1, "username": 1, "full_name": 1, "avatar_color": 1}
+
+
+class UserLoader:
+    def __init__(self, collection, projection: Optional[Dict[str, Any]] = None):
+        self.collection = collection
+        self.projection = projection or USER_PROFILE_PROJECTION
+        self._futures: Dict[str, asyncio.Future] = {}
+        self._pending: List[str] = []
+        self._dispatch_task: Optional[asyncio.Task] = None
+
+    async def load(self, user_id: str) -> Optional[Dict[str, Any]]:
+        future = self._futures.get(user_id)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = self._futures[user_id] = loop.create_future()
+            self._pending.append(user_id)
+            if len(self._pending) == 1:
+                # Let the other loads issued in this tick join the batch
+                loop.call_soon(self._schedule_dispatch)
+        return await future
+
+    async def load_many(self, user_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Load several users at once; missing users are left out of the result"""
+        user_ids = list(dict.fromkeys(user_ids))
+        users = await asyncio.gather(*(self.load(user_id) for user_id in user_ids))
+        return {user_id: user for user_id, user in zip(user_ids, users) if user is not None}
+
+    def _schedule_dispatch(self):
+        self._dispatch_task = asyncio.ensure_future(self._dispatch())
+
+    async def _dispatch(self):
+        user_ids, self._pending = self._pending, []
+        try:
+            users = await self.collection.find({"id": {"$in": user_ids}}, self.projection).to_list(length=None)
+        except Exception as e:
+            for user_id in user_ids:
+                self._futures.pop(user_id).set_exception(e)
+            return
+
+        by_id = {user["id"]: user for user in users}
+        for user_id in user_ids:
+            self._futures[user_id].set_result(by_id.get(user_id))
@@ -0,0 +1,180 @@
+"""Prometheus metrics for HTTP handlers and MongoDB operations.
+
+``MetricsMiddleware`` records a latency histogram and an in-flight gauge per
+route template (``/api/groups/{group_id}``, not the raw path), and
+``instrument_database`` wraps the Motor database handle so every collection
+operation is timed by collection and operation name. Together they show which
+handlers spend the MongoDB budget. ``metrics_response`` renders the registry
+for the ``/metrics`` endpoint.
+
+``prometheus_client`` is optional: without it the middleware and the
+database wrapper pass everything through untouched.
+"""
+import inspect
+import time
+from typing import Any, Tuple
+
+from starlette.routing import Match
+
+try:
+    from prometheus_client import CONTENT_TYPE_LATEST, Gauge, Histogram, generate_latest
+except ImportError:  # prometheus_client is optional
+    Histogram = None
+
+METRICS_ENABLED = Histogram is not None
+UNMATCHED_ROUTE = "<unmatched>"
+
+# Collection methods that return a cursor instead of an awaitable
+CURSOR_METHODS = frozenset({"find", "aggregate", "list_indexes", "find_raw_batches", "aggregate_raw_batches"})
+
+if METRICS_ENABLED:
+    REQUEST_LATENCY = Histogram(
+        "actify_http_request_duration_seconds",
+        "HTTP request latency by route template",
+        ["method", "route", "status_code"]
+    )
+    REQUESTS_IN_FLIGHT = Gauge(
+        "actify_http_requests_in_flight",
+        "HTTP requests currently being handled",
+        ["method", "route"]
+    )
+    MONGO_LATENCY = Histogram(
+        "actify_mongo_operation_duration_seconds",
+        "MongoDB operation latency by collection and operation",
+        ["collection", "operation"],
+        buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+    )
+
+
+def route_template(scope) -> str:
+    """Path template of the route a request will hit, without dispatching it"""
+    partial = None
+    for route in scope["app"].router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+        if match == Match.PARTIAL and partial is None:
+            partial = route.path
+    return partial or UNMATCHED_ROUTE
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if not METRICS_ENABLED or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method, route = scope["method"], route_template(scope)
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        in_flight = REQUESTS_IN_FLIGHT.labels(method, route)
+        in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            in_flight.dec()
+            REQUEST_LATENCY.labels(method, route, str(status_code)).observe(time.perf_counter() - started)
+
+
+def metrics_response() -> Tuple[bytes, str]:
+    """Rendered metrics and their content type"""
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+
+def instrument_database(db):
+    return InstrumentedDatabase(db) if METRICS_ENABLED else db
+
+
+class InstrumentedDatabase:
+    """Motor database proxy whose collections time every operation"""
+
+    def __init__(self, db):
+        self._db = db
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._db, name)
+        if not name.startswith("_") and hasattr(attr, "find_one"):
+            return InstrumentedCollection(attr)
+        return attr
+
+    def __getitem__(self, name: str):
+        return InstrumentedCollection(self._db[name])
+
+
+class InstrumentedCollection:
+    def __init__(self, collection):
+        self._collection = collection
+        self._name = collection.name
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._collection, name)
+        if name.startswith("_") or not callable(attr):
+            return attr
+
+        def operation(*args, **kwargs):
+            started = time.perf_counter()
+            result = attr(*args, **kwargs)
+            if name in CURSOR_METHODS:
+                return InstrumentedCursor(result, MONGO_LATENCY.labels(self._name, name))
+            if inspect.isawaitable(result):
+                return _timed(result, MONGO_LATENCY.labels(self._name, name), started)
+            return result
+
+        return operation
+
+
+async def _timed(awaitable, histogram, started: float):
+    try:
+        return await awaitable
+    finally:
+        histogram.observe(time.perf_counter() - started)
+
+
+class InstrumentedCursor:
+    """Times a cursor's round trips: one observation per to_list or full iteration"""
+
+    def __init__(self, cursor, histogram):
+        self._cursor = cursor
+        self._histogram = histogram
+        self._iterator = None
+        self._elapsed = 0.0
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._cursor, name)
+        if not callable(attr):
+            return attr
+
+        def chained(*args, **kwargs):
+            result = attr(*args, **kwargs)
+            # sort(), limit() and friends return the cursor itself
+            return self if result is self._cursor else result
+
+        return chained
+
+    async def to_list(self, *args, **kwargs):
+        return await _timed(self._cursor.to_list(*args, **kwargs), self._histogram, time.perf_counter())
+
+    def __aiter__(self):
+        self._iterator = self._cursor.__aiter__()
+        self._elapsed = 0.0
+        return self
+
+    async def __anext__(self):
+        started = time.perf_counter()
+        try:
+            return await self._iterator.__anext__()
+        except StopAsyncIteration:
+            self._histogram.observe(self._elapsed + time.perf_counter() - started)
+            raise
+        finally:
+            self._elapsed += time.perf_counter() - started
@@ -0,0 +1,91 @@
+"""One-time data migrations for the ACTIFY database.
+
+Migrations are registered by name and recorded in ``db.migrations`` once
+they complete, so running the command again only applies new ones. The API
+applies pending migrations on startup; the command is for running them ahead
+of a deploy or re-running one:
+
+    python migrations.py            # apply every pending migration
+    python migrations.py --list     # show registered migrations and their status
+    python migrations.py NAME ...   # (re)run specific migrations
+"""
+import logging
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional
+
+from comments import migrate_embedded_comments
+from completions import backfill_activity_sequences
+from counters import seed_challenge_counters
+from follow_graph import backfill_follow_counts
+from scheduler import backfill_activated_at
+from timeutils import migrate_string_datetimes
+from uploads import migrate_inline_photos
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS: Dict[str, Callable[..., Awaitable[int]]] = {}
+
+
+def register_migration(name: str, migration: Callable[..., Awaitable[int]]):
+    MIGRATIONS[name] = migration
+
+
+register_migration("0001_comments_collection", migrate_embedded_comments)
+register_migration("0002_bson_datetimes", migrate_string_datetimes)
+register_migration("0003_follow_counts", backfill_follow_counts)
+register_migration("0004_activity_sequences", backfill_activity_sequences)
+register_migration("0005_challenge_activations", backfill_activated_at)
+register_migration("0006_challenge_counters", seed_challenge_counters)
+register_migration("0007_inline_photos", migrate_inline_photos)
+
+
+async def applied_migrations(db) -> List[str]:
+    return [doc["_id"] for doc in await db.migrations.find({}, {"_id": 1}).to_list(length=None)]
+
+
+async def run_migrations(db, names: Optional[Iterable[str]] = None) -> Dict[str, int]:
+    """Run the named migrations, or every pending one; returns documents touched per migration"""
+    if names is None:
+        done = set(await applied_migrations(db))
+        names = [name for name in MIGRATIONS if name not in done]
+
+    results = {}
+    for name in names:
+        logger.info("Running migration %s", name)
+        results[name] = await MIGRATIONS[name](db)
+        await db.migrations.update_one(
+            {"_id": name},
+            {"$set": {"applied_at": datetime.utcnow(), "documents": results[name]}},
+            upsert=True
+        )
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+    import asyncio
+    import json
+    import os
+    from pathlib import Path
+
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    parser = argparse.ArgumentParser(description="Apply one-time ACTIFY data migrations")
+    parser.add_argument("names", nargs="*", help="migrations to run (default: every pending one)")
+    parser.add_argument("--list", action="store_true", help="list migrations and whether they were applied")
+    args = parser.parse_args()
+    unknown = set(args.names) - set(MIGRATIONS)
+    if unknown:
+        parser.error(f"unknown migrations: {', '.join(sorted(unknown))}")
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    load_dotenv(Path(__file__).parent / '.env')
+    database = AsyncIOMotorClient(os.environ['MONGO_URL'])[os.environ['DB_NAME']]
+
+    if args.list:
+        done = set(asyncio.run(applied_migrations(database)))
+        for migration_name in MIGRATIONS:
+            print(f"{'[x]' if migration_name in done else '[ ]'} {migration_name}")
+    else:
+        print(json.dumps(asyncio.run(run_migrations(database, args.names or None)), indent=2))
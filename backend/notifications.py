@@ -0,0 +1,150 @@
+"""Fan-out-on-write notification pipeline.
+
+Handlers hand notification documents to a ``NotificationDispatcher`` instead
+of inserting them one at a time. A bounded asyncio queue feeds a small pool
+of workers that coalesce whatever is waiting into ``insert_many`` batches, so
+a request only pays for an in-memory enqueue and a global challenge drop can
+stream over every user without holding them all in memory.
+"""
+import asyncio
+import logging
+import uuid
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set
+
+from pymongo.errors import BulkWriteError
+
+logger = logging.getLogger(__name__)
+
+
+def build_notification(
+    user_id: str,
+    notification_type: str,
+    title: str,
+    message: str,
+    data: Optional[Dict] = None,
+    **extra: Any
+) -> Dict[str, Any]:
+    notification = {
+        "id": str(uuid.uuid4()),
+        "user_id": user_id,
+        "type": notification_type,
+        "title": title,
+        "message": message,
+        "data": data or {},
+        "read": False,
+        "created_at": datetime.utcnow()
+    }
+    notification.update(extra)
+    return notification
+
+
+class NotificationDispatcher:
+    def __init__(
+        self,
+        collection,
+        workers: int = 4,
+        batch_size: int = 500,
+        flush_interval: float = 0.05,
+        queue_size: int = 10000
+    ):
+        self.collection = collection
+        self.workers = workers
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue_size = queue_size
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker_tasks: List[asyncio.Task] = []
+        self._background_tasks: Set[asyncio.Task] = set()
+
+    @property
+    def running(self) -> bool:
+        return bool(self._worker_tasks)
+
+    async def start(self):
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._worker_tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        """Wait for background fan-outs and queued notifications, then stop the workers"""
+        if self._background_tasks:
+            await asyncio.gather(*self._background_tasks, return_exceptions=True)
+        if not self.running:
+            return
+        await self._queue.join()
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+
+    async def enqueue(self, notification: Dict[str, Any]):
+        """Queue a notification; blocks only when the queue is full"""
+        if not self.running:
+            # No workers (e.g. scripts importing the app): write straight through
+            await self.collection.insert_one(notification)
+            return
+        await self._queue.put(notification)
+
+    async def notify(self, user_id: str, notification_type: str, title: str, message: str,
+                     data: Optional[Dict] = None, **extra: Any):
+        await self.enqueue(build_notification(user_id, notification_type, title, message, data, **extra))
+
+    async def notify_many(self, user_ids: Iterable[str], notification_type: str, title: str, message: str,
+                          data: Optional[Dict] = None, **extra: Any):
+        for user_id in user_ids:
+            await self.notify(user_id, notification_type, title, message, data, **extra)
+
+    async def fan_out_to_all_users(
+        self,
+        users_collection,
+        build: Callable[[Dict[str, Any]], Dict[str, Any]],
+        page_size: int = 1000
+    ) -> int:
+        """Build and queue one notification per user, paging over users by _id"""
+        sent = 0
+        last_id = None
+        while True:
+            query = {"_id": {"$gt": last_id}} if last_id is not None else {}
+            users = await users_collection.find(
+                query, {"_id": 1, "id": 1, "username": 1}
+            ).sort("_id", 1).limit(page_size).to_list(length=page_size)
+            if not users:
+                break
+            for user in users:
+                await self.enqueue(build(user))
+            sent += len(users)
+            last_id = users[-1]["_id"]
+        return sent
+
+    def spawn(self, coro: Awaitable) -> asyncio.Task:
+        """Run a fan-out in the background, keeping a reference until it finishes"""
+        task = asyncio.ensure_future(coro)
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+        return task
+
+    async def _worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            try:
+                await self.collection.insert_many(batch, ordered=False)
+            except BulkWriteError as e:
+                logger.error("Failed to insert %d of %d notifications: %s",
+                             len(e.details.get("writeErrors", [])), len(batch), e)
+            except Exception:
+                logger.exception("Failed to insert %d notifications", len(batch))
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
@@ -0,0 +1,72 @@
+"""Keyset pagination over (created_at, id) for feeds and notifications.
+
+Cursors are opaque to clients: an urlsafe base64 encoding of the last item's
+``created_at`` and ``id``. Each page is a range scan on a
+``(..., created_at -1, id -1)`` index, so deep pages cost the same as the
+first one.
+"""
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+from pymongo import DESCENDING
+
+KEYSET_SORT = [("created_at", DESCENDING), ("id", DESCENDING)]
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+MAX_PAGE_SIZE = 100
+
+
+def encode_cursor(created_at: datetime, item_id: str) -> str:
+    if isinstance(created_at, datetime):
+        created_at = created_at.isoformat()
+    payload = json.dumps([created_at, item_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, item_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(created_at), str(item_id)
+    except (binascii.Error, ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def keyset_query(query: Dict[str, Any], cursor: Optional[str]) -> Dict[str, Any]:
+    """Restrict query to items strictly after the cursor in KEYSET_SORT order"""
+    if not cursor:
+        return query
+
+    created_at, item_id = decode_cursor(cursor)
+    after_cursor = {"$or": [
+        {"created_at": {"$lt": created_at}},
+        {"created_at": created_at, "id": {"$lt": item_id}}
+    ]}
+    if not query:
+        return after_cursor
+    return {"$and": [query, after_cursor]}
+
+
+async def fetch_page(
+    collection,
+    query: Dict[str, Any],
+    limit: int,
+    cursor: Optional[str] = None,
+    projection: Optional[Dict[str, Any]] = None
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Fetch one page of documents and the cursor for the page after it"""
+    if limit < 1:
+        # MongoDB reads limit(0) as "no limit"; an empty page has no cursor to resume from
+        return [], None
+    docs = await collection.find(
+        keyset_query(query, cursor), projection
+    ).sort(KEYSET_SORT).limit(limit + 1).to_list(length=limit + 1)
+
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        next_cursor = encode_cursor(docs[-1]["created_at"], docs[-1]["id"])
+    return docs, next_cursor
@@ -0,0 +1,43 @@
+"""Named projection profiles for response models.
+
+A profile names how much of a document an endpoint returns: "card" for list
+endpoints, "detail" for single-document reads and "admin" for admin views.
+Each profile is tied to a Pydantic response model, and its MongoDB projection
+is built from that model's fields. A query therefore fetches only what its
+model validates, and list endpoints never pull ``photo_data``,
+``daily_reveals`` or ``weekly_rankings`` off the wire. Legacy inline photos are
+moved to the blob store by a migration, so cards show them via ``photo_url``.
+"""
+from functools import lru_cache
+from typing import Any, Dict, Type
+
+from pydantic import BaseModel
+
+CARD = "card"
+DETAIL = "detail"
+ADMIN = "admin"
+
+
+@lru_cache(maxsize=None)
+def _fields(model: Type[BaseModel]) -> tuple:
+    return tuple(field.alias or name for name, field in model.model_fields.items())
+
+
+def projection_for(model: Type[BaseModel]) -> Dict[str, Any]:
+    """MongoDB projection returning exactly the fields model declares"""
+    projection: Dict[str, Any] = {"_id": 0}
+    projection.update((name, 1) for name in _fields(model))
+    return projection
+
+
+class ProjectionProfiles:
+    """Response models of one collection, keyed by profile name"""
+
+    def __init__(self, **models: Type[BaseModel]):
+        self.models = models
+
+    def model(self, profile: str) -> Type[BaseModel]:
+        return self.models[profile]
+
+    def projection(self, profile: str) -> Dict[str, Any]:
+        return projection_for(self.models[profile])
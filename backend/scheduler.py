@@ -0,0 +1,173 @@
+"""In-process scheduler for global challenge activation and expiry.
+
+On startup the scheduler loads every challenge that has not finished yet and
+keeps a min-heap of their upcoming start and expiry times. A single task
+sleeps until the earliest transition is due, applies it and calls
+``on_activate`` (used for the notification fan-out). New challenges are
+added with ``schedule`` and wake the task if they are due sooner.
+
+Activation is claimed atomically through ``activated_at``, so when several
+worker processes run a scheduler each challenge is activated and announced
+only once. A transition that fails (a transient MongoDB error, say) is pushed
+back onto the heap and retried after ``retry_delay`` seconds.
+"""
+import asyncio
+import heapq
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from pymongo import ReturnDocument
+
+from timeutils import as_utc
+
+logger = logging.getLogger(__name__)
+
+ACTIVATE = "activate"
+EXPIRE = "expire"
+# Expiries sort first so an activation due at the same instant wins
+ACTION_PRIORITY = {EXPIRE: 0, ACTIVATE: 1}
+TRANSITION_RETRY_SECONDS = 5.0
+
+
+class ChallengeScheduler:
+    def __init__(
+        self,
+        collection,
+        on_activate: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None,
+        on_change: Optional[Callable[[], None]] = None,
+        retry_delay: float = TRANSITION_RETRY_SECONDS
+    ):
+        self.collection = collection
+        self.on_activate = on_activate
+        self.on_change = on_change
+        self.retry_delay = timedelta(seconds=retry_delay)
+        self._heap: List[Tuple[datetime, int, int, str, str]] = []
+        self._sequence = 0
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._running = False
+
+    async def start(self):
+        self._wakeup = asyncio.Event()
+        await self.reload()
+        self._running = True
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            # wait_for can swallow a cancel that races with a wakeup, so the loop also checks the flag
+            self._running = False
+            self._wake()
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def reload(self):
+        """Rebuild the heap from every challenge that is still pending or active"""
+        self._heap = []
+        now = datetime.utcnow()
+        projection = {"_id": 0, "id": 1, "created_at": 1, "expires_at": 1, "activated_at": 1}
+        # Expired challenges still marked active are picked up so they get switched off
+        query = {"$or": [{"expires_at": {"$gt": now}}, {"is_active": True}]}
+        async for challenge in self.collection.find(query, projection):
+            self._push_transitions(challenge)
+        self._wake()
+
+    def schedule(self, challenge: Dict[str, Any]):
+        """Track a newly created challenge"""
+        self._push_transitions(challenge)
+        self._wake()
+
+    def _wake(self):
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def _push_transitions(self, challenge: Dict[str, Any]):
+        self._push(as_utc(challenge["expires_at"]), EXPIRE, challenge["id"])
+        if not challenge.get("activated_at"):
+            self._push(as_utc(challenge["created_at"]), ACTIVATE, challenge["id"])
+
+    def _push(self, due: datetime, action: str, challenge_id: str):
+        self._sequence += 1
+        heapq.heappush(self._heap, (due, ACTION_PRIORITY[action], self._sequence, action, challenge_id))
+
+    async def run_due(self) -> Dict[str, int]:
+        """Apply every transition that is due now; returns how many of each were applied"""
+        applied = {ACTIVATE: 0, EXPIRE: 0}
+        now = datetime.utcnow()
+        failed = []
+        # Pop one at a time so a failure only affects the transition being applied
+        while self._heap and self._heap[0][0] <= now:
+            _, _, _, action, challenge_id = heapq.heappop(self._heap)
+            try:
+                if await self._apply(action, challenge_id, now):
+                    applied[action] += 1
+            except Exception:
+                logger.exception("Failed to %s challenge %s; retrying", action, challenge_id)
+                failed.append((action, challenge_id))
+
+        # Pushed back after the loop so a zero retry delay cannot spin within one run
+        for action, challenge_id in failed:
+            self._push(now + self.retry_delay, action, challenge_id)
+
+        if any(applied.values()) and self.on_change:
+            self.on_change()
+        return applied
+
+    async def _apply(self, action: str, challenge_id: str, now: datetime) -> bool:
+        if action == EXPIRE:
+            result = await self.collection.update_one(
+                {"id": challenge_id, "is_active": True}, {"$set": {"is_active": False}}
+            )
+            return result.modified_count > 0
+        return await self._activate(challenge_id, now)
+
+    async def _activate(self, challenge_id: str, now: datetime) -> bool:
+        # Only the process that sets activated_at goes on to announce the challenge
+        challenge = await self.collection.find_one_and_update(
+            {"id": challenge_id, "is_active": False, "activated_at": None},
+            {"$set": {"is_active": True, "activated_at": now}},
+            return_document=ReturnDocument.AFTER
+        )
+        if not challenge:
+            return False
+        if as_utc(challenge["expires_at"]) <= now:
+            await self.collection.update_one({"id": challenge_id}, {"$set": {"is_active": False}})
+            return False
+
+        await self.collection.update_many(
+            {"id": {"$ne": challenge_id}, "is_active": True}, {"$set": {"is_active": False}}
+        )
+        if self.on_activate:
+            await self.on_activate(challenge)
+        return True
+
+    async def _run(self):
+        while self._running:
+            try:
+                await self.run_due()
+            except Exception:
+                logger.exception("Failed to apply challenge transitions")
+
+            self._wakeup.clear()
+            timeout = None
+            if self._heap:
+                timeout = max(0.0, (self._heap[0][0] - datetime.utcnow()).total_seconds())
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+
+async def backfill_activated_at(db) -> int:
+    """Mark challenges that started before activation was tracked as already activated
+
+    Without activated_at the scheduler would treat them as pending and announce
+    them again; challenges still waiting for their start time are left alone.
+    """
+    result = await db.global_challenges.update_many(
+        {"activated_at": {"$exists": False}, "created_at": {"$lte": datetime.utcnow()}},
+        [{"$set": {"activated_at": "$created_at"}}]
+    )
+    return result.modified_count
@@ -0,0 +1,105 @@
+"""Prefix search over usernames and full names.
+
+Each user document carries ``search_prefixes``: the lowercase prefixes of
+its username and of every word of its full name. A multikey index on that
+field turns type-ahead search into an exact index lookup, and candidates are
+ranked in Python so exact and username matches come first. A short prefix can
+match more users than ``CANDIDATE_LIMIT``, so exact username matches are looked
+up separately and merged into the candidates.
+"""
+import re
+import unicodedata
+from typing import Any, Dict, List, Set
+
+from pymongo import UpdateOne
+
+MIN_PREFIX_LENGTH = 2
+MAX_PREFIX_LENGTH = 12
+CANDIDATE_LIMIT = 50
+
+_WORD_SPLIT = re.compile(r"[\s._\-]+")
+
+
+def normalize(text: str) -> str:
+    """Lowercase and strip accents so "José" matches "jose\""""
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch)).lower().strip()
+
+
+def _words(text: str) -> List[str]:
+    return [word for word in _WORD_SPLIT.split(normalize(text)) if word]
+
+
+def search_prefixes(username: str, full_name: str) -> List[str]:
+    """Every indexed prefix for a user; stored on the user document"""
+    terms = {normalize(username)} | set(_words(username)) | set(_words(full_name))
+    full = normalize(full_name)
+    if full:
+        terms.add(full)
+
+    prefixes: Set[str] = set()
+    for term in terms:
+        for length in range(MIN_PREFIX_LENGTH, min(len(term), MAX_PREFIX_LENGTH) + 1):
+            prefixes.add(term[:length])
+    return sorted(prefixes)
+
+
+def search_query(q: str) -> Dict[str, Any]:
+    """Index lookup for a search string; longer queries use their indexed prefix"""
+    return {"search_prefixes": normalize(q)[:MAX_PREFIX_LENGTH]}
+
+
+def exact_username_query(q: str) -> Dict[str, Any]:
+    """Lookup on the unique username index for the query as typed or normalized"""
+    return {"username": {"$in": sorted({q, normalize(q)})}}
+
+
+def merge_candidates(exact: List[Dict[str, Any]], candidates: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    seen = {user["id"] for user in exact}
+    return exact + [user for user in candidates if user["id"] not in seen]
+
+
+def _rank(user: Dict[str, Any], q: str) -> int:
+    username = normalize(user.get("username", ""))
+    full_name = normalize(user.get("full_name", ""))
+    if username == q:
+        return 0
+    if full_name == q:
+        return 1
+    if username.startswith(q):
+        return 2
+    if full_name.startswith(q):
+        return 3
+    if any(word.startswith(q) for word in _words(user.get("username", "")) + _words(user.get("full_name", ""))):
+        return 4
+    return 5
+
+
+def rank_results(users: List[Dict[str, Any]], q: str, limit: int) -> List[Dict[str, Any]]:
+    """Order candidates by match quality, dropping those that only share the indexed prefix"""
+    q = normalize(q)
+    ranked = [(rank, user) for user in users if (rank := _rank(user, q)) < 5]
+    ranked.sort(key=lambda item: (item[0], len(item[1].get("username", "")), item[1].get("username", "")))
+    return [user for _, user in ranked[:limit]]
+
+
+async def backfill_search_prefixes(users_collection, batch_size: int = 500) -> int:
+    """Add search_prefixes to users created before the field existed"""
+    updated = 0
+    cursor = users_collection.find(
+        {"search_prefixes": {"$exists": False}}, {"_id": 1, "username": 1, "full_name": 1}
+    )
+    batch = []
+    async for user in cursor:
+        batch.append(UpdateOne(
+            {"_id": user["_id"]},
+            {"$set": {"search_prefixes": search_prefixes(user.get("username", ""), user.get("full_name", ""))}}
+        ))
+        if len(batch) >= batch_size:
+            await users_collection.bulk_write(batch, ordered=False)
+            updated += len(batch)
+            batch = []
+    if batch:
+        await users_collection.bulk_write(batch, ordered=False)
+        updated += len(batch)
+    return updated
@@ -1,9 +1,13 @@
-from fastapi import FastAPI, APIRouter, HTTPException, UploadFile, File, Form
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, APIRouter, Depends, HTTPException, UploadFile, File, Form, Query, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
 import os
+import sys
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field
@@ -11,15 +15,49 @@ from typing import List, Optional, Dict, Any
 import uuid
 from datetime import datetime, timedelta
 import hashlib
-import base64
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
+# Sibling modules are imported flat so the app runs both as `server:app`
+# from backend/ and as `backend.server:app` from the repository root
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from indexes import ensure_indexes, index_plan
+from blob_store import blob_store_from_env
+from pagination import MAX_PAGE_SIZE, NEXT_CURSOR_HEADER, fetch_page
+from notifications import NotificationDispatcher, build_notification
+from leaderboards import Leaderboards
+from loaders import UserLoader
+from cache import ActiveChallengeCache, TTLCache
+from auth import SessionAuthenticator, create_session_cache
+from search import (
+    CANDIDATE_LIMIT, MIN_PREFIX_LENGTH, backfill_search_prefixes, exact_username_query, merge_candidates,
+    rank_results, search_prefixes, search_query
+)
+from votes import VoteEngine
+from comments import CommentStore
+from scheduler import ChallengeScheduler
+from timeutils import as_utc
+from follow_graph import FollowGraph
+from counters import ChallengeCounters
+from stats import ChallengeStats
+from uploads import (
+    DEFAULT_MAX_UPLOAD_BYTES, DEFAULT_UPLOAD_CONTENT_TYPES, FORM_OVERHEAD_BYTES, RequestSizeLimitMiddleware, UploadPolicy
+)
+from timelines import TimelineService
+from completions import CompletionEngine
+from projections import ADMIN, CARD, DETAIL, ProjectionProfiles
+from fast_json import DefaultJSONResponse, PreEncoded, encode, json_response
+from migrations import run_migrations
+from metrics import MetricsMiddleware, METRICS_ENABLED, instrument_database, metrics_response
+
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
 client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+# Every collection operation is timed when prometheus_client is installed
+db = instrument_database(client[os.environ['DB_NAME']])
 
 # Collections
 users_collection = db.users
@@ -29,8 +67,69 @@ global_challenges_collection = db.global_challenges
 global_submissions_collection = db.global_submissions
 global_votes_collection = db.global_votes
 
+# Notifications are batched into insert_many calls by background workers
+notification_dispatcher = NotificationDispatcher(notifications_collection)
+
+# The active global challenge is read on every feed hit but changes rarely,
+# so it is also kept JSON-encoded
+active_challenge_cache = ActiveChallengeCache(
+    global_challenges_collection,
+    ttl=float(os.environ.get('ACTIVE_CHALLENGE_CACHE_TTL', 30)),
+    encode=lambda challenge: encode(GlobalChallenge(**challenge))
+)
+
+# Rankings pages are kept as encoded JSON until the next submission
+rankings_cache = TTLCache(maxsize=64, ttl=float(os.environ.get('RANKINGS_CACHE_TTL', 10)))
+
+# Bearer sessions resolve through a cache in front of db.sessions; without a
+# shared cache a logout reaches other workers within LOCAL_SESSION_CACHE_TTL
+session_authenticator = SessionAuthenticator(
+    db,
+    create_session_cache(os.environ.get('SESSION_CACHE_URL')),
+    ttl=float(os.environ.get('SESSION_CACHE_TTL', 300))
+)
+bearer_scheme = HTTPBearer(auto_error=False)
+
+# Follower and following sets are cached per user for friends-only feeds
+follow_graph = FollowGraph(
+    follows_collection,
+    users_collection,
+    ttl=float(os.environ.get('FOLLOW_GRAPH_CACHE_TTL', 300))
+)
+
+# Participant totals are kept in a counter document per challenge
+challenge_counters = ChallengeCounters(
+    db.challenge_counters,
+    global_submissions_collection,
+    ttl=float(os.environ.get('CHALLENGE_COUNTER_CACHE_TTL', 5))
+)
+
+challenge_stats = ChallengeStats(global_submissions_collection)
+
+vote_engine = VoteEngine(global_votes_collection, global_submissions_collection, global_challenges_collection)
+comment_store = CommentStore(db.global_comments, global_submissions_collection)
+
+# Completion order and points come from an atomic per-activity sequence
+completion_engine = CompletionEngine(db.daily_activity_completions, db.activity_sequences)
+
+# Group activity feeds are served from per-user timelines written on submission
+timeline_service = TimelineService(db.user_timelines, db.submissions)
+
+# Activity rankings are maintained incrementally on every submission
+leaderboards = Leaderboards(db)
+
+# Photo and proof uploads live in a content-addressed blob store
+blob_store = blob_store_from_env(ROOT_DIR / 'media')
+
+# Uploads are streamed into the blob store in chunks with size and type limits
+upload_policy = UploadPolicy(
+    max_bytes=int(os.environ.get('MAX_UPLOAD_BYTES', DEFAULT_MAX_UPLOAD_BYTES)),
+    content_types=os.environ.get('UPLOAD_CONTENT_TYPES', ','.join(DEFAULT_UPLOAD_CONTENT_TYPES)).split(',')
+)
+
 # Create the main app
-app = FastAPI(title="ACTIFY API", version="1.0.0")
+# Responses are rendered with orjson when it is installed
+app = FastAPI(title="ACTIFY API", version="1.0.0", default_response_class=DefaultJSONResponse)
 
 # NEW: Follow model
 class Follow(BaseModel):
@@ -55,19 +154,27 @@ class GlobalChallenge(BaseModel):
     promptness_window_minutes: int
     is_active: bool
 
-class GlobalSubmission(BaseModel):
+class GlobalChallengeAdmin(GlobalChallenge):
+    activated_at: Optional[datetime] = None
+    send_notifications: bool = True
+
+class GlobalSubmissionCard(BaseModel):
     id: str
     user_id: str
     username: str
     challenge_id: str
     challenge_prompt: str
     description: str
-    photo_data: Optional[str]
+    photo_url: Optional[str] = None
     created_at: datetime
     votes: int = 0
-    comments: List[Dict[str, Any]] = []
+    comment_count: int = 0
+    comments: List[Dict[str, Any]] = []  # Most recent comments only
     reactions: Dict[str, int] = {}
 
+class GlobalSubmission(GlobalSubmissionCard):
+    photo_data: Optional[str] = None  # Legacy inline base64 photos
+
 class UserResponse(BaseModel):
     id: str
     username: str
@@ -77,6 +184,7 @@ class UserResponse(BaseModel):
     avatar_color: str
     groups: List[str] = []
     achievements: List[str] = []
+    stats: Dict[str, int] = {}
 
 class LoginRequest(BaseModel):
     username: str
@@ -89,7 +197,7 @@ class GroupCreate(BaseModel):
     is_public: bool = True
 
 # Enhanced Group Models for Weekly Activity Challenge System
-class GroupResponse(BaseModel):
+class GroupCard(BaseModel):
     id: str
     name: str
     description: str
@@ -110,7 +218,8 @@ class GroupResponse(BaseModel):
     activities_submitted_this_week: int = 0
     activities_needed: int = 7  # Always need 7 total activities
     submission_phase_active: bool = False
-    
+
+class GroupResponse(GroupCard):
     # Daily reveal system
     daily_reveals: List[dict] = []  # Track daily revealed activities
     current_day_activity: Optional[dict] = None
@@ -162,18 +271,21 @@ class ActivitySubmission(BaseModel):
     description: str
     photo_data: Optional[str] = None
 
-class SubmissionResponse(BaseModel):
+class SubmissionCard(BaseModel):
     id: str
     user_id: str
     username: str
     group_id: str
     challenge_type: str
     description: str
-    photo_data: Optional[str]
+    photo_url: Optional[str] = None
     created_at: datetime
     votes: int = 0
     reactions: Dict[str, int] = {}
 
+class SubmissionResponse(SubmissionCard):
+    photo_data: Optional[str] = None  # Legacy inline base64 photos
+
 class NotificationResponse(BaseModel):
     id: str
     user_id: str
@@ -191,6 +303,13 @@ class Achievement(BaseModel):
     icon: str
     unlocked_at: datetime
 
+# Projection profiles: list endpoints fetch only the fields of their "card" model
+group_profiles = ProjectionProfiles(card=GroupCard, detail=GroupResponse)
+submission_profiles = ProjectionProfiles(card=SubmissionCard, detail=SubmissionResponse)
+global_submission_profiles = ProjectionProfiles(card=GlobalSubmissionCard, detail=GlobalSubmission)
+global_challenge_profiles = ProjectionProfiles(card=GlobalChallenge, admin=GlobalChallengeAdmin)
+weekly_activity_profiles = ProjectionProfiles(card=WeeklyActivitySubmission)
+
 # Utility functions
 def hash_password(password: str) -> str:
     return hashlib.sha256(password.encode()).hexdigest()
@@ -200,17 +319,33 @@ def generate_avatar_color() -> str:
     return colors[len(colors) % 8]
 
 async def create_notification(user_id: str, notification_type: str, title: str, message: str, data: Dict = None):
-    notification = {
-        "id": str(uuid.uuid4()),
-        "user_id": user_id,
-        "type": notification_type,
-        "title": title,
-        "message": message,
-        "data": data or {},
-        "read": False,
-        "created_at": datetime.utcnow()
-    }
-    await db.notifications.insert_one(notification)
+    await notification_dispatcher.notify(user_id, notification_type, title, message, data)
+
+async def get_optional_user(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme)
+) -> Optional[Dict[str, Any]]:
+    """Resolve the bearer session to its user, if a valid one was sent"""
+    if not credentials:
+        return None
+    return await session_authenticator.resolve(credentials.credentials)
+
+async def get_current_user(user: Optional[Dict[str, Any]] = Depends(get_optional_user)) -> Dict[str, Any]:
+    """Require a valid bearer session"""
+    if not user:
+        raise HTTPException(
+            status_code=401,
+            detail="Invalid or expired session",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+    return user
+
+def get_user_loader() -> UserLoader:
+    """Request-scoped loader that batches user profile lookups into one $in query"""
+    return UserLoader(db.users)
+
+async def store_upload(upload: UploadFile):
+    """Stream an uploaded file into the blob store and return its reference"""
+    return await upload_policy.store(upload, blob_store)
 
 # API Routes
 
@@ -233,6 +368,7 @@ async def create_user(user_data: UserCreate):
         "email": user_data.email,
         "password": hash_password(user_data.password),
         "full_name": user_data.full_name,
+        "search_prefixes": search_prefixes(user_data.username, user_data.full_name),
         "created_at": datetime.utcnow(),
         "avatar_color": generate_avatar_color(),
         "groups": [],
@@ -240,7 +376,9 @@ async def create_user(user_data: UserCreate):
         "stats": {
             "total_activities": 0,
             "current_streak": 0,
-            "total_groups_joined": 0
+            "total_groups_joined": 0,
+            "followers_count": 0,
+            "following_count": 0
         }
     }
     
@@ -271,6 +409,7 @@ async def login(login_data: LoginRequest):
         "expires_at": datetime.utcnow() + timedelta(days=30)
     }
     await db.sessions.insert_one(session_doc)
+    await session_authenticator.remember(session_doc, user)
     
     return {
         "session_id": session_id,
@@ -278,26 +417,33 @@ async def login(login_data: LoginRequest):
         "message": "Login successful"
     }
 
+@api_router.get("/me", response_model=UserResponse)
+async def get_me(current_user: Dict[str, Any] = Depends(get_current_user)):
+    return UserResponse(**current_user)
+
+@api_router.post("/logout")
+async def logout(credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme)):
+    if credentials:
+        await session_authenticator.revoke(credentials.credentials)
+    return {"message": "Logout successful"}
+
 @api_router.get("/users/search")
 async def search_users(q: str = ""):
-    """Search users by username or full name"""
+    """Search users by username or full name prefix"""
     try:
-        if not q or len(q) < 2:
+        q = q.strip()
+        if len(q) < MIN_PREFIX_LENGTH:
             return []
         
-        # Search by username or full name (case insensitive)
-        users_cursor = db.users.find(
-            {
-                "$or": [
-                    {"username": {"$regex": q, "$options": "i"}},
-                    {"full_name": {"$regex": q, "$options": "i"}}
-                ]
-            },
-            {"_id": 0, "password": 0, "email": 0}
-        ).limit(10)
+        # Prefix lookup on the search_prefixes index, then rank exact and prefix matches first;
+        # exact usernames are fetched separately since a common prefix can overflow the candidates
+        projection = {"_id": 0, "password": 0, "email": 0, "search_prefixes": 0}
+        exact = await db.users.find(exact_username_query(q), projection).to_list(length=None)
+        candidates = await db.users.find(
+            search_query(q), projection
+        ).limit(CANDIDATE_LIMIT).to_list(length=CANDIDATE_LIMIT)
         
-        users = await users_cursor.to_list(length=10)
-        return users
+        return rank_results(merge_candidates(exact, candidates), q, limit=10)
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -369,16 +515,18 @@ async def create_group(
     
     return GroupResponse(**group_doc)
 
-@api_router.get("/groups", response_model=List[GroupResponse])
+@api_router.get("/groups", response_model=List[GroupCard])
 async def get_groups(limit: int = 20):
-    groups = await db.groups.find({"is_public": True}).limit(limit).to_list(length=None)
-    return [GroupResponse(**group) for group in groups]
+    groups = await db.groups.find(
+        {"is_public": True}, group_profiles.projection(CARD)
+    ).limit(limit).to_list(length=None)
+    return json_response([GroupCard(**group) for group in groups])
 
-@api_router.get("/users/{user_id}/groups", response_model=List[GroupResponse])
+@api_router.get("/users/{user_id}/groups", response_model=List[GroupCard])
 async def get_user_groups(user_id: str):
     """Get all groups where the user is a member"""
-    groups = await db.groups.find({"members": user_id}).to_list(length=None)
-    return [GroupResponse(**group) for group in groups]
+    groups = await db.groups.find({"members": user_id}, group_profiles.projection(CARD)).to_list(length=None)
+    return json_response([GroupCard(**group) for group in groups])
 
 # Weekly Activity Challenge System Endpoints
 
@@ -409,6 +557,13 @@ async def join_group_by_invite_code(
         }
     )
     
+    # Add group to user's groups so the feed covers it, and rebuild the timeline with its history
+    await db.users.update_one(
+        {"id": user_id},
+        {"$push": {"groups": group_id}, "$inc": {"stats.total_groups_joined": 1}}
+    )
+    await timeline_service.invalidate(user_id)
+    
     return {"success": True, "message": "Successfully joined group"}
 
 @api_router.post("/groups/{group_id}/set-submission-day")
@@ -469,18 +624,22 @@ async def submit_weekly_activity(
     user_id: str = Form(...)
 ):
     """Submit an activity idea for the weekly challenge"""
-    group = await db.groups.find_one({"id": group_id})
-    if not group:
-        raise HTTPException(status_code=404, detail="Group not found")
-    
-    if not group.get("submission_phase_active", False):
-        raise HTTPException(status_code=400, detail="Submission phase not active")
-    
-    if group.get("activities_submitted_this_week", 0) >= 7:
-        raise HTTPException(status_code=400, detail="All 7 activities already submitted")
+    # Claim the next submission slot atomically; concurrent submitters each get
+    # a distinct order and the guard stops the count at 7
+    group = await db.groups.find_one_and_update(
+        {
+            "id": group_id,
+            "members": user_id,
+            "submission_phase_active": True,
+            "activities_submitted_this_week": {"$lt": 7}
+        },
+        {"$inc": {"activities_submitted_this_week": 1}},
+        return_document=ReturnDocument.AFTER
+    )
+    if group is None:
+        await raise_weekly_submission_rejection(group_id, user_id)
     
-    if user_id not in group["members"]:
-        raise HTTPException(status_code=403, detail="User not in group")
+    new_count = group["activities_submitted_this_week"]
     
     # Create activity submission
     submission_doc = {
@@ -490,7 +649,7 @@ async def submit_weekly_activity(
         "activity_title": activity_title,
         "activity_description": activity_description,
         "week_start": group["current_week_start"],
-        "submission_order": group["activities_submitted_this_week"] + 1,
+        "submission_order": new_count,
         "created_at": datetime.utcnow(),
         "is_revealed": False,
         "reveal_date": None
@@ -498,18 +657,32 @@ async def submit_weekly_activity(
     
     await db.weekly_activity_submissions.insert_one(submission_doc)
     
-    # Update group submission count
-    new_count = group["activities_submitted_this_week"] + 1
-    update_data = {"$set": {"activities_submitted_this_week": new_count}}
-    
-    # If we've reached 7 submissions, end submission phase
+    # The submission that fills the last slot ends the submission phase
     if new_count >= 7:
-        update_data["$set"]["submission_phase_active"] = False
-    
-    await db.groups.update_one({"id": group_id}, update_data)
+        await db.groups.update_one(
+            {"id": group_id, "activities_submitted_this_week": {"$gte": 7}},
+            {"$set": {"submission_phase_active": False}}
+        )
     
     return {"success": True, "submission_count": new_count, "remaining": 7 - new_count}
 
+async def raise_weekly_submission_rejection(group_id: str, user_id: str):
+    """Explain why a weekly activity submission could not claim a slot"""
+    group = await db.groups.find_one(
+        {"id": group_id},
+        {"_id": 0, "members": 1, "submission_phase_active": 1, "activities_submitted_this_week": 1}
+    )
+    if not group:
+        raise HTTPException(status_code=404, detail="Group not found")
+    
+    if not group.get("submission_phase_active", False):
+        raise HTTPException(status_code=400, detail="Submission phase not active")
+    
+    if group.get("activities_submitted_this_week", 0) >= 7:
+        raise HTTPException(status_code=400, detail="All 7 activities already submitted")
+    
+    raise HTTPException(status_code=403, detail="User not in group")
+
 @api_router.get("/groups/{group_id}/weekly-activities")
 async def get_weekly_activities(group_id: str):
     """Get this week's submitted activities for a group"""
@@ -523,7 +696,7 @@ async def get_weekly_activities(group_id: str):
     activities = await db.weekly_activity_submissions.find({
         "group_id": group_id,
         "week_start": group["current_week_start"]
-    }).to_list(length=None)
+    }, weekly_activity_profiles.projection(CARD)).to_list(length=None)
     
     return activities
 
@@ -545,52 +718,21 @@ async def complete_daily_activity(
     user_id: str = Form(...)
 ):
     """Submit proof of completing today's activity"""
-    group = await db.groups.find_one({"id": group_id})
+    group = await db.groups.find_one({"id": group_id}, {"_id": 0, "members": 1})
     if not group:
         raise HTTPException(status_code=404, detail="Group not found")
     
     if user_id not in group["members"]:
         raise HTTPException(status_code=403, detail="User not in group")
     
-    # Check if user already completed this activity
-    existing_completion = await db.daily_activity_completions.find_one({
-        "group_id": group_id,
-        "activity_submission_id": activity_submission_id,
-        "completed_by": user_id
-    })
-    
-    if existing_completion:
-        raise HTTPException(status_code=400, detail="Activity already completed by user")
-    
-    # Count existing completions for this activity to determine points
-    completion_count = await db.daily_activity_completions.count_documents({
-        "group_id": group_id,
-        "activity_submission_id": activity_submission_id
-    })
-    
-    # Determine points (3 for 1st, 2 for 2nd, 1 for 3rd, 0 for rest)
-    points_map = {0: 3, 1: 2, 2: 1}
-    points_earned = points_map.get(completion_count, 0)
-    completion_order = completion_count + 1
+    # Save the proof first so a rejected upload never holds a completion order
+    proof = await store_upload(completion_proof)
     
-    # Save proof image (in production, save to cloud storage)
-    proof_url = f"data:image/jpeg;base64,{completion_proof.file.read().hex()}"
-    
-    # Create completion record
-    completion_doc = {
-        "id": str(uuid.uuid4()),
-        "group_id": group_id,
-        "activity_submission_id": activity_submission_id,
-        "completed_by": user_id,
-        "completion_proof_url": proof_url,
-        "completion_description": completion_description,
-        "completed_at": datetime.utcnow(),
-        "day_of_week": completion_count + 1,  # Simplified
-        "completion_order": completion_order,
-        "points_earned": points_earned
-    }
-    
-    await db.daily_activity_completions.insert_one(completion_doc)
+    # Claim the next completion order and record the completion; points follow the order
+    completion = await completion_engine.complete(
+        group_id, activity_submission_id, user_id, proof, completion_description
+    )
+    points_earned = completion["points_earned"]
     
     # Update user's weekly points
     await db.groups.update_one(
@@ -601,23 +743,24 @@ async def complete_daily_activity(
     return {
         "success": True,
         "points_earned": points_earned,
-        "completion_order": completion_order,
+        "completion_order": completion["completion_order"],
         "message": f"Activity completed! Earned {points_earned} points"
     }
 
 @api_router.get("/groups/{group_id}/weekly-rankings")
-async def get_weekly_rankings(group_id: str):
+async def get_weekly_rankings(group_id: str, user_loader: UserLoader = Depends(get_user_loader)):
     """Get current week's rankings for the group"""
     group = await db.groups.find_one({"id": group_id})
     if not group:
         raise HTTPException(status_code=404, detail="Group not found")
     
-    # Get user details for the rankings
+    # Get user details for the rankings in a single query
     member_rankings = []
     current_points = group.get("current_week_points", {})
+    users = await user_loader.load_many(current_points.keys())
     
     for member_id, points in current_points.items():
-        user = await db.users.find_one({"id": member_id})
+        user = users.get(member_id)
         if user:
             member_rankings.append({
                 "user_id": member_id,
@@ -705,7 +848,7 @@ async def reveal_daily_activity(
 
 @api_router.get("/groups/{group_id}", response_model=GroupResponse)
 async def get_group(group_id: str):
-    group = await db.groups.find_one({"id": group_id})
+    group = await db.groups.find_one({"id": group_id}, group_profiles.projection(DETAIL))
     if not group:
         raise HTTPException(status_code=404, detail="Group not found")
     return GroupResponse(**group)
@@ -732,20 +875,20 @@ async def join_group(group_id: str, user_id: str = Form(...)):
         {"id": user_id},
         {"$push": {"groups": group_id}, "$inc": {"stats.total_groups_joined": 1}}
     )
+    # The new group's history is merged into the feed when the timeline is rebuilt
+    await timeline_service.invalidate(user_id)
     
     # Get user info for notification
     user = await db.users.find_one({"id": user_id})
     
     # Notify all group members (except the new member)
-    for member_id in group["members"]:
-        if member_id != user_id:
-            await create_notification(
-                member_id,
-                "group_join",
-                "New Group Member!",
-                f"{user['username']} joined {group['name']}",
-                {"group_id": group_id, "new_member_id": user_id}
-            )
+    await notification_dispatcher.notify_many(
+        [member_id for member_id in group["members"] if member_id != user_id],
+        "group_join",
+        "New Group Member!",
+        f"{user['username']} joined {group['name']}",
+        {"group_id": group_id, "new_member_id": user_id}
+    )
     
     return {"message": "Successfully joined group", "group_id": group_id}
 
@@ -763,11 +906,10 @@ async def create_submission(
     if not group or user_id not in group.get("members", []):
         raise HTTPException(status_code=403, detail="Not a member of this group")
     
-    # Process photo if provided
-    photo_data = None
+    # Store photo if provided
+    photo_ref = None
     if photo:
-        content = await photo.read()
-        photo_data = base64.b64encode(content).decode('utf-8')
+        photo_ref = await store_upload(photo)
     
     # Get user info
     user = await db.users.find_one({"id": user_id})
@@ -780,13 +922,17 @@ async def create_submission(
         "group_id": group_id,
         "challenge_type": challenge_type,
         "description": description,
-        "photo_data": photo_data,
+        "photo": photo_ref.to_ref() if photo_ref else None,
+        "photo_url": photo_ref.url if photo_ref else None,
         "created_at": datetime.utcnow(),
         "votes": 0,
         "reactions": {}
     }
     
     await db.submissions.insert_one(submission_doc)
+    await timeline_service.fan_out(group["members"], submission_doc)
+    await leaderboards.record_activity(user_id, user["username"], submission_doc["created_at"])
+    rankings_cache.clear()
     
     # Update user stats
     await db.users.update_one(
@@ -795,25 +941,28 @@ async def create_submission(
     )
     
     # Notify group members
-    for member_id in group["members"]:
-        if member_id != user_id:
-            await create_notification(
-                member_id,
-                "new_activity",
-                "New Activity Posted!",
-                f"{user['username']} completed the {challenge_type} challenge",
-                {"group_id": group_id, "submission_id": submission_id}
-            )
+    await notification_dispatcher.notify_many(
+        [member_id for member_id in group["members"] if member_id != user_id],
+        "new_activity",
+        "New Activity Posted!",
+        f"{user['username']} completed the {challenge_type} challenge",
+        {"group_id": group_id, "submission_id": submission_id}
+    )
     
     return SubmissionResponse(**submission_doc)
 
-@api_router.get("/groups/{group_id}/submissions", response_model=List[SubmissionResponse])
-async def get_group_submissions(group_id: str, limit: int = 20):
-    submissions = await db.submissions.find({"group_id": group_id}).sort("created_at", -1).limit(limit).to_list(length=None)
-    return [SubmissionResponse(**submission) for submission in submissions]
+@api_router.get("/groups/{group_id}/submissions", response_model=List[SubmissionCard])
+async def get_group_submissions(group_id: str, limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE), cursor: Optional[str] = None):
+    submissions, next_cursor = await fetch_page(
+        db.submissions, {"group_id": group_id}, limit, cursor, submission_profiles.projection(CARD)
+    )
+    return json_response(
+        [SubmissionCard(**submission) for submission in submissions],
+        headers={NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None
+    )
 
-@api_router.get("/submissions/feed", response_model=List[SubmissionResponse])
-async def get_activity_feed(user_id: str, limit: int = 50):
+@api_router.get("/submissions/feed", response_model=List[SubmissionCard])
+async def get_activity_feed(user_id: str, limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE), cursor: Optional[str] = None):
     # Get user's groups
     user = await db.users.find_one({"id": user_id})
     if not user:
@@ -823,19 +972,24 @@ async def get_activity_feed(user_id: str, limit: int = 50):
     if not user_groups:
         return []
     
-    # Get submissions from user's groups
-    submissions = await db.submissions.find(
-        {"group_id": {"$in": user_groups}}
-    ).sort("created_at", -1).limit(limit).to_list(length=None)
+    # Get submissions from user's groups through their materialized timeline
+    submissions, next_cursor = await timeline_service.page(
+        user_id, user_groups, limit, cursor, submission_profiles.projection(CARD)
+    )
     
-    return [SubmissionResponse(**submission) for submission in submissions]
+    return json_response(
+        [SubmissionCard(**submission) for submission in submissions],
+        headers={NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None
+    )
 
 # Notification Routes
 @api_router.get("/notifications/{user_id}", response_model=List[NotificationResponse])
-async def get_notifications(user_id: str, limit: int = 50):
-    notifications = await db.notifications.find(
-        {"user_id": user_id}
-    ).sort("created_at", -1).limit(limit).to_list(length=None)
+async def get_notifications(
+    response: Response, user_id: str, limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE), cursor: Optional[str] = None
+):
+    notifications, next_cursor = await fetch_page(db.notifications, {"user_id": user_id}, limit, cursor)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
     
     return [NotificationResponse(**notification) for notification in notifications]
 
@@ -854,77 +1008,67 @@ async def mark_notification_read(notification_id: str):
 # Rankings Routes
 @api_router.get("/rankings/weekly")
 async def get_weekly_rankings(limit: int = 10):
-    # Get submissions from last 7 days
-    week_ago = datetime.utcnow() - timedelta(days=7)
-    
-    pipeline = [
-        {"$match": {"created_at": {"$gte": week_ago}}},
-        {"$group": {"_id": "$user_id", "count": {"$sum": 1}, "username": {"$first": "$username"}}},
-        {"$sort": {"count": -1}},
-        {"$limit": limit}
-    ]
+    cached = rankings_cache.get(("weekly", limit))
+    if cached is not None:
+        return json_response(cached)
     
-    rankings = await db.submissions.aggregate(pipeline).to_list(length=None)
+    # Read the top of the materialized 7-day leaderboard
+    rankings = await leaderboards.top_weekly(limit)
     
     result = []
     for i, ranking in enumerate(rankings):
         result.append({
             "rank": i + 1,
-            "user_id": ranking["_id"],
+            "user_id": ranking["user_id"],
             "username": ranking["username"],
             "activity_count": ranking["count"],
             "period": "weekly"
         })
     
-    return result
+    cached = PreEncoded(encode(result))
+    rankings_cache.set(("weekly", limit), cached)
+    return json_response(cached)
 
 @api_router.get("/rankings/alltime")
 async def get_alltime_rankings(limit: int = 10):
-    pipeline = [
-        {"$group": {"_id": "$user_id", "count": {"$sum": 1}, "username": {"$first": "$username"}}},
-        {"$sort": {"count": -1}},
-        {"$limit": limit}
-    ]
+    cached = rankings_cache.get(("alltime", limit))
+    if cached is not None:
+        return json_response(cached)
     
-    rankings = await db.submissions.aggregate(pipeline).to_list(length=None)
+    rankings = await leaderboards.top_alltime(limit)
     
     result = []
     for i, ranking in enumerate(rankings):
         result.append({
             "rank": i + 1,
-            "user_id": ranking["_id"],
+            "user_id": ranking["user_id"],
             "username": ranking["username"],
             "activity_count": ranking["count"],
             "period": "all-time"
         })
     
-    return result
+    cached = PreEncoded(encode(result))
+    rankings_cache.set(("alltime", limit), cached)
+    return json_response(cached)
 
 # Global Challenge Routes
 @api_router.get("/global-challenges/current")
 async def get_current_global_challenge():
-    # Get the most recent active global challenge
-    challenge = await db.global_challenges.find_one(
-        {"is_active": True}, 
-        sort=[("created_at", -1)]
-    )
+    # Get the most recent active global challenge, already encoded
+    challenge, encoded_challenge = await active_challenge_cache.get_encoded()
     
     if not challenge:
         return {"challenge": None, "status": "no_active_challenge"}
     
     now = datetime.utcnow()
+    # as_utc also reads ISO strings written before the date migration
+    promptness_expired = now > (as_utc(challenge["created_at"]) + timedelta(minutes=challenge["promptness_window_minutes"]))
     
-    # Parse datetime strings
-    created_at = datetime.fromisoformat(challenge["created_at"].replace('Z', '+00:00')) if isinstance(challenge["created_at"], str) else challenge["created_at"]
-    expires_at = datetime.fromisoformat(challenge["expires_at"].replace('Z', '+00:00')) if isinstance(challenge["expires_at"], str) else challenge["expires_at"]
-    
-    promptness_expired = now > (created_at + timedelta(minutes=challenge["promptness_window_minutes"]))
-    
-    return {
-        "challenge": GlobalChallenge(**challenge),
+    return json_response({
+        "challenge": PreEncoded(encoded_challenge),
         "promptness_expired": promptness_expired,
-        "time_remaining": max(0, int((expires_at - now).total_seconds()))
-    }
+        "time_remaining": max(0, int((as_utc(challenge["expires_at"]) - now).total_seconds()))
+    })
 
 @api_router.post("/global-challenges")
 async def create_global_challenge(
@@ -948,10 +1092,14 @@ async def create_global_challenge(
         "created_at": now,
         "expires_at": now + timedelta(hours=duration_hours),
         "promptness_window_minutes": promptness_window_minutes,
-        "is_active": True
+        "is_active": True,
+        "activated_at": now
     }
     
+    await challenge_counters.create(challenge_id)
     await db.global_challenges.insert_one(challenge_doc)
+    active_challenge_cache.invalidate()
+    challenge_scheduler.schedule(challenge_doc)
     return GlobalChallenge(**challenge_doc)
 
 @api_router.post("/global-submissions")
@@ -962,7 +1110,9 @@ async def create_global_submission(
     photo: Optional[UploadFile] = File(None)
 ):
     # Verify challenge exists and is active
-    challenge = await db.global_challenges.find_one({"id": challenge_id, "is_active": True})
+    challenge = await active_challenge_cache.get()
+    if not challenge or challenge["id"] != challenge_id:
+        challenge = await db.global_challenges.find_one({"id": challenge_id, "is_active": True})
     if not challenge:
         raise HTTPException(status_code=404, detail="Challenge not found or expired")
     
@@ -974,11 +1124,10 @@ async def create_global_submission(
     if existing:
         raise HTTPException(status_code=400, detail="Already submitted for this challenge")
     
-    # Process photo if provided
-    photo_data = None
+    # Store photo if provided
+    photo_ref = None
     if photo:
-        content = await photo.read()
-        photo_data = base64.b64encode(content).decode('utf-8')
+        photo_ref = await store_upload(photo)
     
     # Get user info
     user = await db.users.find_one({"id": user_id})
@@ -993,14 +1142,22 @@ async def create_global_submission(
         "challenge_id": challenge_id,
         "challenge_prompt": challenge["prompt"],
         "description": description,
-        "photo_data": photo_data,
+        "photo": photo_ref.to_ref() if photo_ref else None,
+        "photo_url": photo_ref.url if photo_ref else None,
         "created_at": datetime.utcnow(),
         "votes": 0,
+        "comment_count": 0,
         "comments": [],
         "reactions": {}
     }
     
-    await db.global_submissions.insert_one(submission_doc)
+    try:
+        await db.global_submissions.insert_one(submission_doc)
+    except DuplicateKeyError:
+        raise HTTPException(status_code=400, detail="Already submitted for this challenge")
+    await challenge_counters.increment(challenge_id)
+    await leaderboards.record_activity(user_id, user["username"], submission_doc["created_at"])
+    rankings_cache.clear()
     
     # Update user stats
     await db.users.update_one(
@@ -1014,14 +1171,12 @@ async def create_global_submission(
 async def get_global_feed(
     user_id: str,
     challenge_id: Optional[str] = None,
-    limit: int = 50,
-    friends_only: bool = False
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    friends_only: bool = False,
+    cursor: Optional[str] = None
 ):
     # Check if user has submitted for the current challenge
-    current_challenge = await db.global_challenges.find_one(
-        {"is_active": True}, 
-        sort=[("created_at", -1)]
-    )
+    current_challenge, encoded_challenge = await active_challenge_cache.get_encoded()
     
     if not current_challenge:
         return {"status": "no_active_challenge", "submissions": []}
@@ -1035,91 +1190,56 @@ async def get_global_feed(
     })
     
     if not user_submission:
-        return {
+        return json_response({
             "status": "locked", 
-            "challenge": GlobalChallenge(**current_challenge),
+            "challenge": PreEncoded(encoded_challenge),
             "message": "Complete today's Global Challenge to unlock the feed!"
-        }
+        })
     
     # Build query for submissions
     submissions_query = {"challenge_id": target_challenge_id}
     
     # If friends_only is enabled, filter to include only user's submissions and followed users' submissions
     if friends_only:
-        # Get list of users the current user is following
-        following_docs = await db.follows.find({"follower_id": user_id}).to_list(None)
-        following_ids = [follow["following_id"] for follow in following_docs]
-        
         # Include current user's own submissions and submissions from followed users
-        following_ids.append(user_id)  # Include user's own submissions
-        submissions_query["user_id"] = {"$in": following_ids}
+        following_ids = await follow_graph.following(user_id)
+        submissions_query["user_id"] = {"$in": [*following_ids, user_id]}
     
-    # Get submissions for this challenge
-    submissions = await db.global_submissions.find(
-        submissions_query
-    ).sort("created_at", -1).limit(limit).to_list(length=None)
+    # Get submissions for this challenge; cards carry the latest comments and the thread is paged separately
+    submissions, next_cursor = await fetch_page(
+        db.global_submissions, submissions_query, limit, cursor, global_submission_profiles.projection(CARD)
+    )
     
     # Get total participation count (always global, not filtered by friends)
-    total_participants = await db.global_submissions.count_documents(
-        {"challenge_id": target_challenge_id}
-    )
+    total_participants = await challenge_counters.participants(target_challenge_id)
     
-    # Get friends participation count if friends_only is enabled
+    # Get friends participation count if friends_only is enabled; a single
+    # first page already holds every friend submission
     friends_participants = 0
     if friends_only:
-        friends_participants = await db.global_submissions.count_documents(
-            submissions_query
-        )
+        if cursor is None and next_cursor is None:
+            friends_participants = len(submissions)
+        else:
+            friends_participants = await db.global_submissions.count_documents(
+                submissions_query
+            )
     
-    return {
+    return json_response({
         "status": "unlocked",
-        "challenge": GlobalChallenge(**current_challenge),
-        "submissions": [GlobalSubmission(**sub) for sub in submissions],
+        "challenge": PreEncoded(encoded_challenge),
+        "submissions": [GlobalSubmissionCard(**sub) for sub in submissions],
+        "next_cursor": next_cursor,
         "total_participants": total_participants,
         "friends_participants": friends_participants if friends_only else total_participants,
         "user_submitted": True,
         "friends_only": friends_only
-    }
+    })
 
 @api_router.post("/global-submissions/{submission_id}/vote")
 async def vote_global_submission(submission_id: str, user_id: str = Form(...)):
-    # Check if submission exists
-    submission = await db.global_submissions.find_one({"id": submission_id})
-    if not submission:
-        raise HTTPException(status_code=404, detail="Submission not found")
-    
-    # Prevent self-voting
-    if submission["user_id"] == user_id:
-        raise HTTPException(status_code=400, detail="Cannot vote on your own submission")
-    
-    # Check if user already voted (stored in separate votes collection)
-    existing_vote = await db.global_votes.find_one({
-        "submission_id": submission_id,
-        "user_id": user_id
-    })
-    
-    if existing_vote:
-        # Remove vote
-        await db.global_votes.delete_one({"_id": existing_vote["_id"]})
-        await db.global_submissions.update_one(
-            {"id": submission_id},
-            {"$inc": {"votes": -1}}
-        )
-        return {"voted": False, "votes": submission["votes"] - 1}
-    else:
-        # Add vote
-        vote_doc = {
-            "id": str(uuid.uuid4()),
-            "submission_id": submission_id,
-            "user_id": user_id,
-            "created_at": datetime.utcnow()
-        }
-        await db.global_votes.insert_one(vote_doc)
-        await db.global_submissions.update_one(
-            {"id": submission_id},
-            {"$inc": {"votes": 1}}
-        )
-        return {"voted": True, "votes": submission["votes"] + 1}
+    # Toggle the vote; the returned count reflects every concurrent vote
+    voted, votes = await vote_engine.toggle(submission_id, user_id)
+    return {"voted": voted, "votes": votes}
 
 @api_router.post("/global-submissions/{submission_id}/comment")
 async def comment_global_submission(
@@ -1127,11 +1247,6 @@ async def comment_global_submission(
     comment: str = Form(...),
     user_id: str = Form(...)
 ):
-    # Check if submission exists
-    submission = await db.global_submissions.find_one({"id": submission_id})
-    if not submission:
-        raise HTTPException(status_code=404, detail="Submission not found")
-    
     # Get user info
     user = await db.users.find_one({"id": user_id})
     if not user:
@@ -1145,14 +1260,36 @@ async def comment_global_submission(
         "created_at": datetime.utcnow()
     }
     
-    # Add comment to submission
-    await db.global_submissions.update_one(
-        {"id": submission_id},
-        {"$push": {"comments": comment_doc}}
-    )
+    # Add comment to the comments collection and the submission's recent comments
+    if not await comment_store.add(submission_id, comment_doc):
+        raise HTTPException(status_code=404, detail="Submission not found")
     
     return {"message": "Comment added successfully", "comment": comment_doc}
 
+@api_router.get("/global-submissions/{submission_id}/comments")
+async def get_submission_comments(submission_id: str, limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE), cursor: Optional[str] = None):
+    """Page through a submission's comments, newest first"""
+    comments, next_cursor = await comment_store.page(submission_id, limit, cursor)
+    return {"comments": comments, "next_cursor": next_cursor}
+
+# Media Routes
+@api_router.get("/media/{blob_hash}")
+async def get_media(blob_hash: str):
+    """Stream an uploaded photo or proof from the blob store"""
+    info = await blob_store.stat(blob_hash)
+    if not info:
+        raise HTTPException(status_code=404, detail="Media not found")
+    
+    return StreamingResponse(
+        blob_store.iter_chunks(info.hash),
+        media_type=info.content_type,
+        headers={
+            "Content-Length": str(info.size),
+            "ETag": f'"{info.hash}"',
+            "Cache-Control": "public, max-age=31536000, immutable"
+        }
+    )
+
 # Achievement Routes
 @api_router.get("/achievements/{user_id}", response_model=List[Achievement])
 async def get_user_achievements(user_id: str):
@@ -1205,6 +1342,9 @@ async def get_user_achievements(user_id: str):
 # Include the router in the main app
 app.include_router(api_router)
 
+# Bodies over the upload limit are refused before the form parser spools them
+app.add_middleware(RequestSizeLimitMiddleware, max_bytes=upload_policy.max_bytes + FORM_OVERHEAD_BYTES)
+
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -1212,8 +1352,19 @@ app.add_middleware(
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
+# Per-route latency histograms and in-flight gauges, exposed on /metrics
+app.add_middleware(MetricsMiddleware)
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    if not METRICS_ENABLED:
+        raise HTTPException(status_code=503, detail="prometheus_client is not installed")
+    body, content_type = metrics_response()
+    return Response(content=body, headers={"Content-Type": content_type})
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -1221,6 +1372,39 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@app.on_event("startup")
+async def create_db_indexes():
+    await ensure_indexes(db)
+
+@app.on_event("startup")
+async def apply_pending_migrations():
+    # Registered before the scheduler starts so it only ever loads migrated challenges
+    await run_migrations(db)
+
+@app.on_event("startup")
+async def backfill_user_search():
+    await backfill_search_prefixes(db.users)
+
+@app.on_event("startup")
+async def backfill_leaderboards():
+    await leaderboards.rebuild_if_empty([db.submissions, db.global_submissions])
+
+@app.on_event("startup")
+async def start_notification_dispatcher():
+    await notification_dispatcher.start()
+
+@app.on_event("startup")
+async def start_challenge_scheduler():
+    await challenge_scheduler.start()
+
+@app.on_event("shutdown")
+async def stop_challenge_scheduler():
+    await challenge_scheduler.stop()
+
+@app.on_event("shutdown")
+async def stop_notification_dispatcher():
+    await notification_dispatcher.stop()
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
     client.close()
@@ -1234,8 +1418,8 @@ async def follow_user(
     """Follow a user"""
     try:
         # Check if users exist
-        user = await users_collection.find_one({"id": user_id})
-        follower = await users_collection.find_one({"id": follower_id})
+        user = await users_collection.find_one({"id": user_id}, {"_id": 0, "id": 1})
+        follower = await users_collection.find_one({"id": follower_id}, {"_id": 0, "id": 1, "username": 1})
         
         if not user or not follower:
             raise HTTPException(status_code=404, detail="User not found")
@@ -1243,38 +1427,23 @@ async def follow_user(
         if user_id == follower_id:
             raise HTTPException(status_code=400, detail="Cannot follow yourself")
         
-        # Check if already following
-        existing_follow = await follows_collection.find_one({
-            "follower_id": follower_id,
-            "following_id": user_id
-        })
-        
-        if existing_follow:
+        # Create follow relationship; the unique follow index rejects duplicates
+        if not await follow_graph.follow(follower_id, user_id):
             raise HTTPException(status_code=400, detail="Already following this user")
         
-        # Create follow relationship
-        follow_data = {
-            "id": str(uuid.uuid4()),
-            "follower_id": follower_id,
-            "following_id": user_id,
-            "created_at": datetime.utcnow().isoformat()
-        }
-        
-        await follows_collection.insert_one(follow_data)
-        
         # Create notification for the followed user
-        notification_data = {
-            "id": str(uuid.uuid4()),
-            "user_id": user_id,
-            "type": "new_follower",
-            "message": f"{follower['username']} started following you!",
-            "read": False,
-            "created_at": datetime.utcnow().isoformat()
-        }
-        await notifications_collection.insert_one(notification_data)
+        await notification_dispatcher.notify(
+            user_id,
+            "new_follower",
+            "New Follower!",
+            f"{follower['username']} started following you!",
+            {"follower_id": follower_id}
+        )
         
         return {"success": True, "message": "Successfully followed user"}
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -1286,16 +1455,13 @@ async def unfollow_user(
     """Unfollow a user"""
     try:
         # Remove follow relationship
-        result = await follows_collection.delete_one({
-            "follower_id": follower_id,
-            "following_id": user_id
-        })
-        
-        if result.deleted_count == 0:
+        if not await follow_graph.unfollow(follower_id, user_id):
             raise HTTPException(status_code=404, detail="Follow relationship not found")
         
         return {"success": True, "message": "Successfully unfollowed user"}
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -1303,15 +1469,14 @@ async def unfollow_user(
 async def get_following(user_id: str):
     """Get list of users that user_id is following"""
     try:
-        follows = await follows_collection.find({"follower_id": user_id}).to_list(None)
-        following_ids = [follow["following_id"] for follow in follows]
+        following_ids = await follow_graph.following(user_id)
         
         if not following_ids:
             return []
         
         # Get user details for each followed user
         following_users = await users_collection.find(
-            {"id": {"$in": following_ids}},
+            {"id": {"$in": list(following_ids)}},
             {"_id": 0, "password": 0, "email": 0}
         ).to_list(None)
         
@@ -1324,15 +1489,14 @@ async def get_following(user_id: str):
 async def get_followers(user_id: str):
     """Get list of users following user_id"""
     try:
-        follows = await follows_collection.find({"following_id": user_id}).to_list(None)
-        follower_ids = [follow["follower_id"] for follow in follows]
+        follower_ids = await follow_graph.followers(user_id)
         
         if not follower_ids:
             return []
         
         # Get user details for each follower
         followers = await users_collection.find(
-            {"id": {"$in": follower_ids}},
+            {"id": {"$in": list(follower_ids)}},
             {"_id": 0, "password": 0, "email": 0}
         ).to_list(None)
         
@@ -1345,12 +1509,7 @@ async def get_followers(user_id: str):
 async def get_follow_status(user_id: str, target_user_id: str):
     """Check if user_id is following target_user_id"""
     try:
-        follow = await follows_collection.find_one({
-            "follower_id": user_id,
-            "following_id": target_user_id
-        })
-        
-        return {"is_following": follow is not None}
+        return {"is_following": await follow_graph.is_following(user_id, target_user_id)}
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -1366,11 +1525,11 @@ async def create_scheduled_challenge(
     """Create a global challenge (admin function)"""
     try:
         challenge_id = str(uuid.uuid4())
-        now = datetime.now()
+        now = datetime.utcnow()
         
         # Parse start time or use now
         if start_time:
-            start_datetime = datetime.fromisoformat(start_time.replace('Z', '+00:00'))
+            start_datetime = as_utc(start_time)
         else:
             start_datetime = now
             
@@ -1380,24 +1539,31 @@ async def create_scheduled_challenge(
         challenge_data = {
             "id": challenge_id,
             "prompt": prompt,
-            "created_at": start_datetime.isoformat(),
-            "expires_at": expires_at.isoformat(),
+            "created_at": start_datetime,
+            "expires_at": expires_at,
             "promptness_window_minutes": promptness_window_minutes,
-            "is_active": start_datetime <= now <= expires_at
+            "is_active": start_datetime <= now <= expires_at,
+            "send_notifications": send_notifications
         }
+        if challenge_data["is_active"]:
+            challenge_data["activated_at"] = now
         
-        global_challenges_collection.insert_one(challenge_data)
+        await challenge_counters.create(challenge_id)
+        await global_challenges_collection.insert_one(challenge_data)
+        challenge_scheduler.schedule(challenge_data)
         
         # Deactivate any other active challenges
         if challenge_data["is_active"]:
-            global_challenges_collection.update_many(
+            await global_challenges_collection.update_many(
                 {"id": {"$ne": challenge_id}, "is_active": True},
                 {"$set": {"is_active": False}}
             )
+        active_challenge_cache.invalidate()
         
-        # Send notifications to all users about the new global challenge
+        # Send notifications to all users about the new global challenge in the background;
+        # challenges starting later are announced by the scheduler when they activate
         if send_notifications and challenge_data["is_active"]:
-            send_global_challenge_notifications(challenge_id, prompt)
+            notification_dispatcher.spawn(send_global_challenge_notifications(challenge_id, prompt))
         
         # Remove MongoDB ObjectId for JSON response
         challenge_data.pop('_id', None)
@@ -1407,52 +1573,54 @@ async def create_scheduled_challenge(
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-def send_global_challenge_notifications(challenge_id: str, prompt: str):
+async def send_global_challenge_notifications(challenge_id: str, prompt: str):
     """Send notifications to all users about a new global challenge"""
-    try:
-        # Get all active users (you might want to limit this or batch it for scale)
-        users = list(users_collection.find({}, {"id": 1, "username": 1}).limit(1000))
-        
-        notifications_to_insert = []
-        for user in users:
-            notification_data = {
-                "id": str(uuid.uuid4()),
-                "user_id": user["id"],
-                "type": "global_challenge_drop",
-                "challenge_id": challenge_id,  # Important for deep linking
-                "message": f"🌍 New Global Challenge: {prompt[:50]}{'...' if len(prompt) > 50 else ''}",
-                "title": "New Global Challenge!",
-                "read": False,
-                "created_at": datetime.now().isoformat(),
-                "action_url": "/feed",  # Deep link to home/today screen
-                "metadata": {
-                    "challenge_id": challenge_id,
-                    "challenge_prompt": prompt,
-                    "notification_category": "global_challenge"
-                }
+    message = f"🌍 New Global Challenge: {prompt[:50]}{'...' if len(prompt) > 50 else ''}"
+    
+    def build(user):
+        return build_notification(
+            user["id"],
+            "global_challenge_drop",
+            "New Global Challenge!",
+            message,
+            {"challenge_id": challenge_id},
+            challenge_id=challenge_id,  # Important for deep linking
+            action_url="/feed",  # Deep link to home/today screen
+            metadata={
+                "challenge_id": challenge_id,
+                "challenge_prompt": prompt,
+                "notification_category": "global_challenge"
             }
-            notifications_to_insert.append(notification_data)
-        
-        # Batch insert notifications
-        if notifications_to_insert:
-            notifications_collection.insert_many(notifications_to_insert)
-            print(f"Sent {len(notifications_to_insert)} global challenge notifications")
-        
+        )
+    
+    try:
+        # Stream over every user in pages; the dispatcher batches the inserts
+        sent = await notification_dispatcher.fan_out_to_all_users(users_collection, build)
+        logger.info("Queued %d global challenge notifications", sent)
     except Exception as e:
-        print(f"Failed to send global challenge notifications: {e}")
+        logger.error("Failed to send global challenge notifications: %s", e)
+
+async def announce_global_challenge(challenge: Dict[str, Any]):
+    """Scheduler hook: notify everyone when a scheduled challenge goes live"""
+    if challenge.get("send_notifications", True):
+        notification_dispatcher.spawn(send_global_challenge_notifications(challenge["id"], challenge["prompt"]))
+
+# Scheduled challenges are activated and expired in-process at their exact times
+challenge_scheduler = ChallengeScheduler(
+    global_challenges_collection,
+    on_activate=announce_global_challenge,
+    on_change=active_challenge_cache.invalidate
+)
 
 # Enhanced notification endpoint with metadata
 @app.get("/api/notifications/{user_id}")
-def get_user_notifications(user_id: str, limit: int = 50):
+async def get_user_notifications(user_id: str, limit: int = 50):
     """Get notifications for a user with enhanced metadata"""
     try:
-        notifications = list(notifications_collection.find(
-            {"user_id": user_id}
-        ).sort("created_at", -1).limit(limit))
-        
-        # Remove MongoDB ObjectId
-        for notification in notifications:
-            notification.pop('_id', None)
+        notifications = await notifications_collection.find(
+            {"user_id": user_id},
+            {"_id": 0}
+        ).sort("created_at", -1).limit(limit).to_list(length=limit)
         
         return notifications
         
@@ -1460,57 +1628,70 @@ def get_user_notifications(user_id: str, limit: int = 50):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.patch("/api/notifications/{notification_id}/read")
-def mark_notification_read(notification_id: str):
+async def mark_notification_read(notification_id: str):
     """Mark a notification as read"""
     try:
-        result = notifications_collection.update_one(
+        result = await notifications_collection.update_one(
             {"id": notification_id},
-            {"$set": {"read": True, "read_at": datetime.now().isoformat()}}
+            {"$set": {"read": True, "read_at": datetime.utcnow()}}
         )
         
-        if result.modified_count == 0:
+        if result.matched_count == 0:
             raise HTTPException(status_code=404, detail="Notification not found")
         
         return {"success": True, "message": "Notification marked as read"}
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/admin/indexes")
+async def get_index_plan(collection: Optional[str] = None):
+    """Report the index plan applied at startup (admin function)"""
+    return {"indexes": index_plan(collection)}
+
 @app.get("/api/admin/global-challenges")
-async def list_all_challenges():
-    """List all global challenges (admin function)"""
+async def list_all_challenges(limit: int = 100):
+    """List global challenges, newest first (admin function)"""
     try:
-        challenges = list(global_challenges_collection.find({}, {"_id": 0}).sort("created_at", -1))
+        limit = max(1, min(limit, 500))
+        challenges = await global_challenges_collection.find(
+            {}, global_challenge_profiles.projection(ADMIN)
+        ).sort("created_at", -1).limit(limit).to_list(length=limit)
         return challenges
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/admin/global-challenges/{challenge_id}/activate")
-def activate_challenge(challenge_id: str):
+async def activate_challenge(challenge_id: str):
     """Manually activate a challenge (admin function)"""
     try:
-        # Deactivate all other challenges
-        global_challenges_collection.update_many(
-            {"is_active": True},
-            {"$set": {"is_active": False}}
-        )
-        
-        # Activate the specified challenge
-        result = global_challenges_collection.update_one(
+        # Activate the specified challenge; activated_at stops the scheduler activating it again
+        result = await global_challenges_collection.update_one(
             {"id": challenge_id},
-            {"$set": {"is_active": True}}
+            {"$set": {"is_active": True, "activated_at": datetime.utcnow()}}
         )
         
-        if result.modified_count == 0:
+        if result.matched_count == 0:
             raise HTTPException(status_code=404, detail="Challenge not found")
         
+        # Deactivate all other challenges
+        await global_challenges_collection.update_many(
+            {"id": {"$ne": challenge_id}, "is_active": True},
+            {"$set": {"is_active": False}}
+        )
+        active_challenge_cache.invalidate()
+        
         return {"success": True, "message": "Challenge activated"}
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/admin/global-challenges/auto-schedule")
-def auto_schedule_challenges():
+async def auto_schedule_challenges():
     """Auto-schedule predefined challenges for the next week"""
     try:
         # Predefined challenge prompts
@@ -1527,7 +1708,7 @@ def auto_schedule_challenges():
             "Photo of you enjoying movement outdoors! 🌳"
         ]
         
-        now = datetime.now()
+        now = datetime.utcnow()
         created_challenges = []
         
         # Create challenges for the next 7 days (one per day)
@@ -1541,15 +1722,20 @@ def auto_schedule_challenges():
             challenge_data = {
                 "id": challenge_id,
                 "prompt": prompt,
-                "created_at": start_time.isoformat(),
-                "expires_at": expires_at.isoformat(),
+                "created_at": start_time,
+                "expires_at": expires_at,
                 "promptness_window_minutes": 5,
                 "is_active": False,  # Will be activated when the time comes
                 "auto_scheduled": True
             }
             
-            global_challenges_collection.insert_one(challenge_data)
-            created_challenges.append({k: v for k, v in challenge_data.items() if k != '_id'})  # Remove ObjectId
+            created_challenges.append(challenge_data)
+        
+        await challenge_counters.create(*(challenge["id"] for challenge in created_challenges))
+        await global_challenges_collection.insert_many(created_challenges)
+        for challenge_data in created_challenges:
+            challenge_data.pop('_id', None)  # Remove ObjectId
+            challenge_scheduler.schedule(challenge_data)
         
         return {
             "success": True, 
@@ -1563,39 +1749,24 @@ def auto_schedule_challenges():
 
 @app.post("/api/admin/update-challenge-status")
 async def update_challenge_status():
-    """Update challenge status based on current time (called periodically)"""
+    """Resync the challenge scheduler with the database and apply any due transitions.
+
+    The scheduler already switches challenges at their start and expiry times;
+    this is only needed after challenges were edited outside the API.
+    """
     try:
-        now = datetime.now()
-        now_iso = now.isoformat()
-        
-        # Deactivate expired challenges
-        expired_result = global_challenges_collection.update_many(
-            {
-                "is_active": True,
-                "expires_at": {"$lt": now_iso}
-            },
-            {"$set": {"is_active": False}}
-        )
-        
-        # Activate challenges that should start now
-        activated_result = global_challenges_collection.update_many(
-            {
-                "is_active": False,
-                "created_at": {"$lte": now_iso},
-                "expires_at": {"$gt": now_iso}
-            },
-            {"$set": {"is_active": True}}
-        )
+        await challenge_scheduler.reload()
+        applied = await challenge_scheduler.run_due()
         
         # Get current active challenge
-        active_challenge = global_challenges_collection.find_one({"is_active": True})
+        active_challenge = await active_challenge_cache.get()
         
         return {
             "success": True,
-            "expired_challenges": expired_result.modified_count,
-            "activated_challenges": activated_result.modified_count,
+            "expired_challenges": applied["expire"],
+            "activated_challenges": applied["activate"],
             "current_active_challenge": active_challenge["prompt"] if active_challenge else None,
-            "timestamp": now_iso
+            "timestamp": datetime.utcnow().isoformat()
         }
         
     except Exception as e:
@@ -1606,31 +1777,18 @@ async def update_challenge_status():
 async def get_challenge_stats(challenge_id: str):
     """Get statistics for a specific challenge"""
     try:
-        challenge = global_challenges_collection.find_one({"id": challenge_id})
+        challenge = await global_challenges_collection.find_one({"id": challenge_id}, {"_id": 0})
         if not challenge:
             raise HTTPException(status_code=404, detail="Challenge not found")
         
-        # Get submission stats
-        total_submissions = global_submissions_collection.count_documents({"challenge_id": challenge_id})
-        total_votes = global_votes_collection.count_documents({"submission_id": {"$in": [
-            sub["id"] for sub in global_submissions_collection.find({"challenge_id": challenge_id}, {"id": 1})
-        ]}})
-        
-        # Get top submissions
-        top_submissions = list(global_submissions_collection.find(
-            {"challenge_id": challenge_id}
-        ).sort("votes", -1).limit(3))
-        
+        # Totals, vote sum and top submissions in one aggregation
         return {
             "challenge": challenge,
-            "stats": {
-                "total_submissions": total_submissions,
-                "total_votes": total_votes,
-                "participation_rate": f"{total_submissions} users participated",
-                "top_submissions": top_submissions
-            }
+            "stats": await challenge_stats.get(challenge)
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -0,0 +1,58 @@
+"""Global challenge statistics.
+
+``ChallengeStats`` computes a challenge's submission total, vote total and
+top submissions with one ``$facet`` aggregation over its submissions. Vote
+totals are summed from the denormalized ``votes`` field rather than counted
+in ``global_votes``. Once a challenge has expired its stats can no longer
+change (``VoteEngine`` rejects late votes), so they are cached for the life of
+the process. Top submissions are projected to the fields that freeze at
+expiry, since comments are still accepted afterwards.
+"""
+from datetime import datetime
+from typing import Any, Dict
+
+from cache import TTLCache
+from timeutils import as_utc
+
+TOP_SUBMISSIONS = 3
+# Fields that are frozen once a challenge expires; comments and reactions keep changing
+TOP_SUBMISSION_FIELDS = ("id", "user_id", "username", "description", "photo_url", "votes", "created_at")
+
+
+class ChallengeStats:
+    def __init__(self, submissions, top: int = TOP_SUBMISSIONS, maxsize: int = 1024):
+        self.submissions = submissions
+        self.top = top
+        self._finished = TTLCache(maxsize=maxsize, ttl=float("inf"))
+
+    async def get(self, challenge: Dict[str, Any]) -> Dict[str, Any]:
+        stats = self._finished.get(challenge["id"])
+        if stats is not None:
+            return stats
+
+        stats = await self._compute(challenge["id"])
+        if as_utc(challenge["expires_at"]) <= datetime.utcnow():
+            self._finished.set(challenge["id"], stats)
+        return stats
+
+    async def _compute(self, challenge_id: str) -> Dict[str, Any]:
+        pipeline = [
+            {"$match": {"challenge_id": challenge_id}},
+            {"$facet": {
+                "totals": [{"$group": {"_id": None, "submissions": {"$sum": 1}, "votes": {"$sum": "$votes"}}}],
+                "top": [
+                    {"$sort": {"votes": -1, "created_at": 1}},
+                    {"$limit": self.top},
+                    {"$project": {"_id": 0, **{field: 1 for field in TOP_SUBMISSION_FIELDS}}}
+                ]
+            }}
+        ]
+        result = await self.submissions.aggregate(pipeline).to_list(length=1)
+        facets = result[0] if result else {"totals": [], "top": []}
+        totals = facets["totals"][0] if facets["totals"] else {"submissions": 0, "votes": 0}
+        return {
+            "total_submissions": totals["submissions"],
+            "total_votes": totals["votes"],
+            "participation_rate": f"{totals['submissions']} users participated",
+            "top_submissions": facets["top"]
+        }
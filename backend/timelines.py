@@ -0,0 +1,110 @@
+"""Materialized per-user activity timelines.
+
+``db.user_timelines`` keeps, for each user, the newest submission keys
+(``created_at`` and ``id``) across all of their groups. The list is ordered
+newest first and capped at ``TIMELINE_LENGTH``. ``create_submission`` pushes
+the new key to every member's timeline (groups have at most 7 members), so
+reading a feed page is one point read plus one ``$in`` on submission ids,
+however many groups the user is in.
+
+Timelines are built lazily from ``db.submissions`` the first time a feed is
+read, and dropped when the user joins a group so the next read rebuilds them.
+Pages past the end of a full timeline fall back to querying the groups directly.
+
+A timeline also records the groups it was built from and is rebuilt when they
+no longer match, so a join that lands while a rebuild is running is not lost.
+Every fan-out bumps the timeline's ``version``; a rebuild records the version
+before it reads the submissions and only stores its result if the version is
+unchanged, so a submission fanned out meanwhile is never overwritten.
+"""
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from pymongo import UpdateOne
+
+from pagination import KEYSET_SORT, decode_cursor, encode_cursor, fetch_page
+
+TIMELINE_LENGTH = 500
+TIMELINE_SORT = {"created_at": -1, "id": -1}
+
+
+class TimelineService:
+    def __init__(self, timelines, submissions, length: int = TIMELINE_LENGTH):
+        self.timelines = timelines
+        self.submissions = submissions
+        self.length = length
+
+    async def fan_out(self, member_ids: Iterable[str], submission: Dict[str, Any]):
+        """Add a new submission to the timelines of its group's members"""
+        # BSON dates keep milliseconds; match the stored submission so cursors compare equal
+        created_at = submission["created_at"]
+        entry = {"created_at": created_at.replace(microsecond=created_at.microsecond // 1000 * 1000), "id": submission["id"]}
+        update = {
+            "$push": {"entries": {"$each": [entry], "$sort": TIMELINE_SORT, "$slice": self.length}},
+            "$inc": {"version": 1}
+        }
+        # Only existing timelines are updated; missing ones are built from scratch on read
+        operations = [UpdateOne({"_id": member_id}, update) for member_id in member_ids]
+        if operations:
+            await self.timelines.bulk_write(operations, ordered=False)
+
+    async def invalidate(self, user_id: str):
+        await self.timelines.delete_one({"_id": user_id})
+
+    async def page(
+        self,
+        user_id: str,
+        group_ids: List[str],
+        limit: int,
+        cursor: Optional[str] = None,
+        projection: Optional[Dict[str, Any]] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """One feed page across group_ids, newest first, and the cursor for the next one"""
+        if limit < 1:
+            return [], None
+        projection = projection or {"_id": 0}
+        entries = await self._entries(user_id, group_ids)
+        start = 0
+        if cursor:
+            created_at, item_id = decode_cursor(cursor)
+            start = next(
+                (i for i, entry in enumerate(entries) if (entry["created_at"], entry["id"]) < (created_at, item_id)),
+                len(entries)
+            )
+
+        window = entries[start:start + limit + 1]
+        if len(window) <= limit and len(entries) >= self.length:
+            # The page runs past the capped timeline, so older items come from the groups themselves
+            return await fetch_page(self.submissions, {"group_id": {"$in": group_ids}}, limit, cursor, projection)
+
+        page_entries = window[:limit]
+        ids = [entry["id"] for entry in page_entries]
+        docs = await self.submissions.find({"id": {"$in": ids}}, projection).to_list(length=len(ids))
+        by_id = {doc["id"]: doc for doc in docs}
+
+        next_cursor = None
+        if len(window) > limit:
+            next_cursor = encode_cursor(page_entries[-1]["created_at"], page_entries[-1]["id"])
+        return [by_id[item_id] for item_id in ids if item_id in by_id], next_cursor
+
+    async def _entries(self, user_id: str, group_ids: List[str]) -> List[Dict[str, Any]]:
+        timeline = await self.timelines.find_one({"_id": user_id})
+        if timeline is not None and timeline.get("group_ids") == sorted(group_ids):
+            # $push keeps the list sorted already; re-sorting is linear and makes the cursor scan safe
+            return sorted(timeline["entries"], key=lambda entry: (entry["created_at"], entry["id"]), reverse=True)
+        return await self._rebuild(user_id, group_ids)
+
+    async def _rebuild(self, user_id: str, group_ids: List[str]) -> List[Dict[str, Any]]:
+        # Create the document first so fan-outs from here on bump a version this rebuild can check
+        await self.timelines.update_one({"_id": user_id}, {"$setOnInsert": {"version": 0}}, upsert=True)
+        timeline = await self.timelines.find_one({"_id": user_id}, {"version": 1})
+
+        entries = await self.submissions.find(
+            {"group_id": {"$in": group_ids}}, {"_id": 0, "created_at": 1, "id": 1}
+        ).sort(KEYSET_SORT).limit(self.length).to_list(length=self.length)
+        if timeline is not None:
+            # Dropped by invalidate or changed by a fan-out meanwhile: serve the result but do not store it
+            await self.timelines.update_one(
+                {"_id": user_id, "version": timeline.get("version")},
+                {"$set": {"entries": entries, "group_ids": sorted(group_ids)}}
+            )
+        return entries
@@ -0,0 +1,74 @@
+"""Timestamp helpers.
+
+Every timestamp is stored as a naive UTC ``datetime`` (a BSON date), so
+range queries and sorts on fields like ``created_at`` and ``expires_at`` can
+use indexes. Older documents stored ISO strings; ``as_utc`` reads both and
+``migrate_string_datetimes`` rewrites the strings in place. Offset-less
+strings were written with either ``datetime.now()`` (server local time) or
+``datetime.utcnow()``, so the migration reads each field with the clock that
+wrote it.
+"""
+from datetime import datetime, timezone
+from typing import Dict
+
+from pymongo import UpdateOne
+
+LOCAL_TIME = "local"
+UTC_TIME = "utc"
+
+# Collections and fields that were written as ISO strings before timestamps
+# were unified, with the clock each was written with
+STRING_DATETIME_FIELDS: Dict[str, Dict[str, str]] = {
+    "global_challenges": {"created_at": LOCAL_TIME, "expires_at": LOCAL_TIME},
+    "follows": {"created_at": UTC_TIME},
+    "notifications": {"created_at": LOCAL_TIME, "read_at": LOCAL_TIME},
+}
+# Notification types whose created_at was written with datetime.utcnow() rather than datetime.now()
+UTC_NOTIFICATION_TYPES = frozenset({"new_follower"})
+
+
+def as_utc(value, clock: str = LOCAL_TIME) -> datetime:
+    """Naive UTC datetime for a stored timestamp or client-supplied ISO string.
+
+    BSON dates are already UTC; ISO strings without an offset are read in
+    ``clock``, server local time unless they were written with utcnow().
+    """
+    if isinstance(value, datetime):
+        moment = value
+    else:
+        moment = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+        if moment.tzinfo is None:
+            moment = moment.replace(tzinfo=timezone.utc) if clock == UTC_TIME else moment.astimezone()
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment
+
+
+def _clock(collection_name: str, field: str, doc: Dict) -> str:
+    if collection_name == "notifications" and field == "created_at" and doc.get("type") in UTC_NOTIFICATION_TYPES:
+        return UTC_TIME
+    return STRING_DATETIME_FIELDS[collection_name][field]
+
+
+async def migrate_string_datetimes(db, batch_size: int = 500) -> int:
+    """Convert ISO string timestamps to BSON dates; returns documents updated"""
+    updated = 0
+    for collection_name, fields in STRING_DATETIME_FIELDS.items():
+        collection = db[collection_name]
+        query = {"$or": [{field: {"$type": "string"}} for field in fields]}
+        projection = {"type": 1, **{field: 1 for field in fields}}
+        batch = []
+        async for doc in collection.find(query, projection):
+            changes = {
+                field: as_utc(doc[field], _clock(collection_name, field, doc))
+                for field in fields if isinstance(doc.get(field), str)
+            }
+            batch.append(UpdateOne({"_id": doc["_id"]}, {"$set": changes}))
+            if len(batch) >= batch_size:
+                await collection.bulk_write(batch, ordered=False)
+                updated += len(batch)
+                batch = []
+        if batch:
+            await collection.bulk_write(batch, ordered=False)
+            updated += len(batch)
+    return updated
@@ -0,0 +1,145 @@
+"""Streaming upload handling for photos and completion proofs.
+
+Starlette spools multipart files to a temporary file, so an ``UploadFile``
+is never fully in memory unless the handler reads it all at once.
+``UploadPolicy.store`` reads it in chunks and streams them into the blob store
+while it hashes them. It rejects disallowed content types with 415 and files
+over the size limit with 413.
+
+The form parser spools the whole body before a handler runs, so
+``RequestSizeLimitMiddleware`` caps the request body first: it answers 413
+from ``Content-Length`` without reading anything, and stops a body sent
+without one as soon as it grows past the limit.
+
+Photos from before the blob store were stored inline as base64
+``photo_data``; ``migrate_inline_photos`` moves them into the blob store so
+card projections, which only fetch ``photo_url``, still show them.
+"""
+import base64
+import binascii
+import logging
+from pathlib import Path
+from typing import AsyncIterator, FrozenSet, Iterable, Optional
+
+from fastapi import HTTPException, UploadFile
+from fastapi.responses import JSONResponse
+from starlette.datastructures import Headers
+
+from blob_store import DEFAULT_CHUNK_SIZE, BlobInfo, BlobStore, blob_store_from_env
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_UPLOAD_BYTES = 10 * 1024 * 1024
+DEFAULT_UPLOAD_CONTENT_TYPES = (
+    "image/jpeg", "image/png", "image/gif", "image/webp", "image/heic", "image/heif",
+    "video/mp4", "video/quicktime", "video/webm",
+)
+# Room for the other form fields and multipart boundaries alongside one file
+FORM_OVERHEAD_BYTES = 1024 * 1024
+INLINE_PHOTO_COLLECTIONS = ("submissions", "global_submissions")
+_IMAGE_SIGNATURES = (
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+)
+
+
+class UploadPolicy:
+    def __init__(
+        self,
+        max_bytes: int = DEFAULT_MAX_UPLOAD_BYTES,
+        content_types: Iterable[str] = DEFAULT_UPLOAD_CONTENT_TYPES,
+        chunk_size: int = DEFAULT_CHUNK_SIZE
+    ):
+        self.max_bytes = max_bytes
+        self.content_types: FrozenSet[str] = frozenset(content_type.strip().lower() for content_type in content_types)
+        self.chunk_size = chunk_size
+
+    async def store(self, upload: UploadFile, blob_store: BlobStore) -> BlobInfo:
+        """Validate an upload and stream it into the blob store"""
+        content_type = (upload.content_type or "").split(";")[0].strip().lower()
+        if content_type not in self.content_types:
+            raise HTTPException(status_code=415, detail=f"Unsupported file type: {content_type or 'unknown'}")
+        return await blob_store.put_stream(self._chunks(upload), content_type)
+
+    async def _chunks(self, upload: UploadFile) -> AsyncIterator[bytes]:
+        received = 0
+        while True:
+            chunk = await upload.read(self.chunk_size)
+            if not chunk:
+                break
+            received += len(chunk)
+            if received > self.max_bytes:
+                raise HTTPException(
+                    status_code=413,
+                    detail=f"File too large; the limit is {self.max_bytes} bytes"
+                )
+            yield chunk
+
+
+class RequestSizeLimitMiddleware:
+    def __init__(self, app, max_bytes: int):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        content_length = Headers(scope=scope).get("content-length", "")
+        if content_length.isdigit() and int(content_length) > self.max_bytes:
+            await self._too_large()(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    # Raised inside the form parser, which FastAPI turns into the response
+                    raise HTTPException(status_code=413, detail=self._detail())
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+    def _detail(self) -> str:
+        return f"Request body too large; the limit is {self.max_bytes} bytes"
+
+    def _too_large(self) -> JSONResponse:
+        return JSONResponse({"detail": self._detail()}, status_code=413)
+
+
+def sniff_image_type(data: bytes) -> str:
+    """Content type of a legacy inline photo, which was stored without one"""
+    for signature, content_type in _IMAGE_SIGNATURES:
+        if data.startswith(signature):
+            return content_type
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    return "image/jpeg"
+
+
+async def migrate_inline_photos(db, blob_store: Optional[BlobStore] = None) -> int:
+    """Move base64 photo_data into the blob store and point photo_url at it"""
+    blob_store = blob_store or blob_store_from_env(Path(__file__).parent / "media")
+    migrated = 0
+    for collection_name in INLINE_PHOTO_COLLECTIONS:
+        collection = db[collection_name]
+        cursor = collection.find({"photo_data": {"$exists": True}}, {"_id": 1, "photo_data": 1, "photo_url": 1})
+        async for doc in cursor:
+            update = {"$unset": {"photo_data": ""}}
+            if doc.get("photo_data") and not doc.get("photo_url"):
+                try:
+                    data = base64.b64decode(doc["photo_data"], validate=True)
+                except (binascii.Error, TypeError):
+                    logger.warning("Skipping unreadable inline photo in %s %s", collection_name, doc["_id"])
+                    continue
+                blob = await blob_store.put(data, sniff_image_type(data))
+                update["$set"] = {"photo": blob.to_ref(), "photo_url": blob.url}
+            await collection.update_one({"_id": doc["_id"]}, update)
+            migrated += 1
+    return migrated
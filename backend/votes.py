@@ -0,0 +1,78 @@
+"""Atomic vote toggling for global submissions.
+
+A unique ``(submission_id, user_id)`` index on ``global_votes`` decides
+whether a vote is being added or removed: the insert either succeeds or
+fails with a duplicate key, in which case the vote is deleted instead. The
+submission is checked first, so missing submissions, self votes and votes on
+expired challenges (whose stats are cached as final) never write a vote. The
+counter is then moved with one ``find_one_and_update`` that returns the real
+post-update count, so bursts of votes never act on a stale snapshot.
+"""
+import uuid
+from datetime import datetime
+from typing import Tuple
+
+from fastapi import HTTPException
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from timeutils import as_utc
+
+
+class VoteEngine:
+    def __init__(self, votes_collection, submissions_collection, challenges_collection):
+        self.votes = votes_collection
+        self.submissions = submissions_collection
+        self.challenges = challenges_collection
+
+    async def toggle(self, submission_id: str, user_id: str) -> Tuple[bool, int]:
+        """Add the user's vote, or remove it if present; returns (voted, votes)"""
+        submission = await self.submissions.find_one({"id": submission_id}, {"_id": 0, "user_id": 1, "challenge_id": 1})
+        if not submission:
+            raise HTTPException(status_code=404, detail="Submission not found")
+        if submission.get("user_id") == user_id:
+            raise HTTPException(status_code=400, detail="Cannot vote on your own submission")
+        challenge = await self.challenges.find_one({"id": submission.get("challenge_id")}, {"_id": 0, "expires_at": 1})
+        if challenge and as_utc(challenge["expires_at"]) <= datetime.utcnow():
+            raise HTTPException(status_code=400, detail="Voting has closed for this challenge")
+
+        voted = await self._toggle_vote(submission_id, user_id)
+        submission = await self.submissions.find_one_and_update(
+            {"id": submission_id},
+            {"$inc": {"votes": 1 if voted else -1}},
+            projection={"_id": 0, "votes": 1},
+            return_document=ReturnDocument.AFTER
+        )
+        if submission is None:
+            # The submission was deleted after the check; leave no dangling vote behind
+            await self._undo(submission_id, user_id, voted)
+            raise HTTPException(status_code=404, detail="Submission not found")
+
+        return voted, submission["votes"]
+
+    async def _toggle_vote(self, submission_id: str, user_id: str) -> bool:
+        vote_key = {"submission_id": submission_id, "user_id": user_id}
+        for _ in range(2):
+            try:
+                await self.votes.insert_one({
+                    "id": str(uuid.uuid4()),
+                    **vote_key,
+                    "created_at": datetime.utcnow()
+                })
+                return True
+            except DuplicateKeyError:
+                result = await self.votes.delete_one(vote_key)
+                if result.deleted_count:
+                    return False
+                # A concurrent toggle removed the vote between our insert and delete; retry
+        raise HTTPException(status_code=409, detail="Vote changed concurrently, please retry")
+
+    async def _undo(self, submission_id: str, user_id: str, voted: bool):
+        vote_key = {"submission_id": submission_id, "user_id": user_id}
+        if voted:
+            await self.votes.delete_one(vote_key)
+        else:
+            try:
+                await self.votes.insert_one({"id": str(uuid.uuid4()), **vote_key, "created_at": datetime.utcnow()})
+            except DuplicateKeyError:
+                pass
@@ -0,0 +1,126 @@
+"""Shared fixtures: the backend runs against an in-memory mongomock database.
+
+The suite has no async plugin, so each test drives its scenario with
+``asyncio.run``. ``api`` sends requests straight to the ASGI app without
+running its startup hooks.
+"""
+import asyncio
+import inspect
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import httpx
+import motor.motor_asyncio
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "actify_test")
+os.environ.setdefault("BLOB_STORE_PATH", tempfile.mkdtemp(prefix="actify-media-"))
+
+# server.py creates its client at import time
+motor.motor_asyncio.AsyncIOMotorClient = AsyncMongoMockClient
+
+
+class InterleavedCollection:
+    """Collection proxy whose operations yield to the event loop before running
+
+    mongomock answers every call without suspending, so coroutines started
+    with asyncio.gather would otherwise run one after another. Yielding first
+    lets them interleave between round trips the way they do against a server.
+    """
+
+    def __init__(self, collection):
+        self._collection = collection
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._collection, name)
+        if not callable(attr):
+            return attr
+
+        def operation(*args, **kwargs):
+            result = attr(*args, **kwargs)
+            if hasattr(result, "to_list"):
+                return InterleavedCursor(result)
+            if not inspect.isawaitable(result):
+                return result
+            return _interleaved(result)
+
+        return operation
+
+
+async def _interleaved(awaitable):
+    await asyncio.sleep(0)
+    return await awaitable
+
+
+class InterleavedCursor:
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._cursor, name)
+        if not callable(attr):
+            return attr
+
+        def chained(*args, **kwargs):
+            result = attr(*args, **kwargs)
+            return self if result is self._cursor else result
+
+        return chained
+
+    def to_list(self, *args, **kwargs):
+        return _interleaved(self._cursor.to_list(*args, **kwargs))
+
+    def __aiter__(self):
+        return self._cursor.__aiter__()
+
+
+class InterleavedDatabase:
+    def __init__(self, database):
+        self._database = database
+
+    def __getattr__(self, name: str):
+        return InterleavedCollection(self._database[name])
+
+    def __getitem__(self, name: str):
+        return InterleavedCollection(self._database[name])
+
+
+@pytest.fixture
+def db():
+    """A fresh, empty database whose concurrent operations interleave"""
+    return InterleavedDatabase(AsyncMongoMockClient()["actify_test"])
+
+
+@pytest.fixture
+def server():
+    """The server module with its database emptied"""
+    import server as server_module
+    asyncio.run(server_module.client.drop_database(os.environ["DB_NAME"]))
+    server_module.active_challenge_cache.invalidate()
+    server_module.rankings_cache.clear()
+    return server_module
+
+
+@pytest.fixture
+def interleaved_server(server, monkeypatch):
+    """The server module with handlers' ``db`` lookups interleaving like the ``db`` fixture
+
+    Services built at import time keep their own collection handles and still run straight through.
+    """
+    monkeypatch.setattr(server, "db", InterleavedDatabase(server.db))
+    return server
+
+
+@pytest.fixture
+def api(server):
+    """Factory for an HTTP client bound to the app; use it inside the test's event loop"""
+    def make_client() -> httpx.AsyncClient:
+        return httpx.AsyncClient(transport=httpx.ASGITransport(app=server.app), base_url="http://testserver")
+    return make_client
@@ -0,0 +1,37 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from auth import LOCAL_SESSION_CACHE_TTL, MemorySessionCache, SessionAuthenticator
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_logout_reaches_other_workers_within_the_local_cache_ttl(db):
+    clock = Clock()
+
+    async def scenario():
+        await db.users.insert_one({"id": "u1", "username": "ana", "password": "x"})
+        await db.sessions.insert_one({
+            "session_id": "s1", "user_id": "u1", "expires_at": datetime.utcnow() + timedelta(days=1)
+        })
+        worker_a = SessionAuthenticator(db, MemorySessionCache(timer=clock), ttl=300)
+        worker_b = SessionAuthenticator(db, MemorySessionCache(timer=clock), ttl=300)
+        assert (await worker_a.resolve("s1"))["username"] == "ana"
+        assert (await worker_b.resolve("s1"))["username"] == "ana"
+
+        await worker_a.revoke("s1")
+        revoked_here = await worker_a.resolve("s1")
+        clock.now += LOCAL_SESSION_CACHE_TTL + 1
+        return revoked_here, await worker_b.resolve("s1")
+
+    assert asyncio.run(scenario()) == (None, None)
+
+
+def test_local_cache_ttl_caps_the_configured_ttl(db):
+    assert SessionAuthenticator(db, MemorySessionCache(), ttl=300).ttl == LOCAL_SESSION_CACHE_TTL
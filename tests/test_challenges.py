@@ -0,0 +1,26 @@
+import asyncio
+from datetime import datetime, timedelta
+
+
+def test_current_challenge_reads_legacy_string_dates(server, api):
+    now = datetime.utcnow()
+
+    async def scenario():
+        # Written by the old code with datetime.now().isoformat(), i.e. server local time
+        await server.db.global_challenges.insert_one({
+            "id": "legacy",
+            "prompt": "Go outside",
+            "created_at": (now - timedelta(hours=1)).astimezone().replace(tzinfo=None).isoformat(),
+            "expires_at": (now + timedelta(hours=1)).astimezone().replace(tzinfo=None).isoformat(),
+            "promptness_window_minutes": 5,
+            "is_active": True,
+        })
+        async with api() as client:
+            current = await client.get("/api/global-challenges/current")
+            stats = await client.get("/api/global-challenges/legacy/stats")
+        return current.status_code, current.json(), stats.status_code
+
+    status, body, stats_status = asyncio.run(scenario())
+    assert (status, stats_status) == (200, 200)
+    assert body["promptness_expired"] is True
+    assert 3500 <= body["time_remaining"] <= 3600
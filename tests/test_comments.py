@@ -0,0 +1,39 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from comments import RECENT_COMMENTS, CommentStore
+
+
+def _comment(i: int):
+    return {"id": f"c{i}", "user_id": "u", "comment": f"comment {i}", "created_at": datetime(2024, 1, 1) + timedelta(minutes=i)}
+
+
+async def _store(db):
+    await db.global_comments.create_index("id", unique=True)
+    return CommentStore(db.global_comments, db.global_submissions)
+
+
+def test_commenting_on_a_legacy_submission_keeps_its_embedded_comments(db):
+    async def scenario():
+        store = await _store(db)
+        # Written before comments had their own collection: no comment_count, every comment embedded
+        await db.global_submissions.insert_one({"id": "s1", "comments": [_comment(i) for i in range(5)]})
+        await asyncio.gather(store.add("s1", _comment(5)), store.add("s1", _comment(6)))
+        submission = await db.global_submissions.find_one({"id": "s1"})
+        ids = sorted(c["id"] for c in await db.global_comments.find({"submission_id": "s1"}).to_list(length=None))
+        return submission["comment_count"], len(submission["comments"]), ids
+
+    assert asyncio.run(scenario()) == (7, RECENT_COMMENTS, [f"c{i}" for i in range(7)])
+
+
+def test_comment_on_missing_submission_is_rejected(db):
+    async def scenario():
+        store = await _store(db)
+        return await store.add("missing", _comment(0)), await db.global_comments.count_documents({})
+
+    assert asyncio.run(scenario()) == (False, 0)
+
+
+def test_feed_cards_carry_recent_comments_but_not_inline_photos(server):
+    projection = server.global_submission_profiles.projection(server.CARD)
+    assert projection.get("comments") == 1 and "photo_data" not in projection
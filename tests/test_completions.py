@@ -0,0 +1,96 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from blob_store import BlobInfo
+from completions import CompletionEngine
+
+PROOF = BlobInfo(hash="a" * 64, size=1, content_type="image/jpeg")
+
+
+async def _engine(db):
+    await db.daily_activity_completions.create_index([("activity_submission_id", 1), ("completed_by", 1)], unique=True)
+    return CompletionEngine(db.daily_activity_completions, db.activity_sequences)
+
+
+async def _yield(times: int):
+    for _ in range(times):
+        await asyncio.sleep(0)
+
+
+async def _complete(engine, user_id):
+    completion = await engine.complete("g", "act", user_id, PROOF, "")
+    return completion["completion_order"]
+
+
+@pytest.mark.parametrize("delay", range(6))
+def test_concurrent_first_completions_get_distinct_orders(db, delay):
+    async def scenario():
+        engine = await _engine(db)
+
+        async def complete_later():
+            await _yield(delay)
+            return await _complete(engine, "u2")
+
+        return sorted(await asyncio.gather(_complete(engine, "u1"), complete_later()))
+
+    assert asyncio.run(scenario()) == [1, 2]
+
+
+def test_repeat_completion_is_rejected(db):
+    async def scenario():
+        engine = await _engine(db)
+        await _complete(engine, "u1")
+        with pytest.raises(HTTPException) as error:
+            await _complete(engine, "u1")
+        return error.value.status_code, await db.daily_activity_completions.count_documents({})
+
+    assert asyncio.run(scenario()) == (400, 1)
+
+
+@pytest.mark.parametrize("delay", range(6))
+def test_failed_completion_leaves_a_gap_instead_of_reusing_its_order(db, delay):
+    async def scenario():
+        engine = await _engine(db)
+        # Recorded before sequences existed, so u1's claim succeeds and its insert then fails
+        await db.daily_activity_completions.insert_one({"activity_submission_id": "act", "completed_by": "u1"})
+
+        async def failing():
+            with pytest.raises(HTTPException):
+                await _complete(engine, "u1")
+
+        async def complete_later(user_id):
+            await _yield(delay)
+            return await _complete(engine, user_id)
+
+        await asyncio.gather(failing(), complete_later("u2"))
+        await _complete(engine, "u3")
+        completions = await db.daily_activity_completions.find({"completion_order": {"$exists": True}}).to_list(None)
+        sequence = await db.activity_sequences.find_one({"_id": "act"})
+        return sorted(c["completion_order"] for c in completions), sequence["completed_by"]
+
+    orders, completed_by = asyncio.run(scenario())
+    assert len(set(orders)) == len(orders) == 2
+    assert sorted(completed_by) == ["u2", "u3"]
+
+
+def test_rejected_upload_does_not_claim_an_order(interleaved_server, api):
+    server = interleaved_server
+
+    async def scenario():
+        await server.db.groups.insert_one({"id": "g", "members": ["u1", "u2"], "current_week_points": {}})
+
+        async def complete(user_id, content_type):
+            async with api() as client:
+                response = await client.post("/api/groups/g/complete-activity", data={
+                    "activity_submission_id": "act", "user_id": user_id
+                }, files={"completion_proof": ("proof", b"proof-" + user_id.encode(), content_type)})
+            return response.status_code, response.json().get("completion_order")
+
+        # u1's upload is rejected while u2 completes; u1 then retries with a valid proof
+        rejected, first = await asyncio.gather(complete("u1", "text/plain"), complete("u2", "image/jpeg"))
+        retried = await complete("u1", "image/jpeg")
+        return rejected, first, retried
+
+    assert asyncio.run(scenario()) == ((415, None), (200, 1), (200, 2))
@@ -0,0 +1,41 @@
+import asyncio
+
+import pytest
+
+from counters import ChallengeCounters
+from migrations import run_migrations
+
+
+async def _yield(times: int):
+    for _ in range(times):
+        await asyncio.sleep(0)
+
+
+@pytest.mark.parametrize("before", range(4))
+@pytest.mark.parametrize("between", range(6))
+def test_concurrent_first_submissions_are_counted_once(db, before, between):
+    async def scenario():
+        counters = ChallengeCounters(db.challenge_counters, db.global_submissions, ttl=0)
+        await counters.create("c1")
+
+        async def submit(user_id, before_insert, before_increment):
+            # Staggering the second submission lets each step of the first land in between
+            await _yield(before_insert)
+            await db.global_submissions.insert_one({"challenge_id": "c1", "user_id": user_id})
+            await _yield(before_increment)
+            await counters.increment("c1")
+
+        await asyncio.gather(submit("u1", 0, 0), submit("u2", before, between))
+        return await counters.participants("c1")
+
+    assert asyncio.run(scenario()) == 2
+
+
+def test_migration_seeds_counters_for_existing_challenges(db):
+    async def scenario():
+        await db.global_challenges.insert_many([{"id": "busy"}, {"id": "quiet"}])
+        await db.global_submissions.insert_many([{"challenge_id": "busy", "user_id": f"u{i}"} for i in range(3)])
+        await run_migrations(db, ["0006_challenge_counters"])
+        return {c["_id"]: c["participants"] for c in await db.challenge_counters.find().to_list(length=None)}
+
+    assert asyncio.run(scenario()) == {"busy": 3, "quiet": 0}
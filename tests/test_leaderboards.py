@@ -0,0 +1,80 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from leaderboards import Leaderboards, day_key
+
+
+async def _seed_submissions(db, per_user):
+    yesterday = datetime.utcnow() - timedelta(days=1)
+    await db.submissions.insert_many([
+        {"id": f"{user_id}-{i}", "user_id": user_id, "username": user_id, "created_at": yesterday}
+        for user_id, count in per_user.items()
+        for i in range(count)
+    ])
+
+
+async def _counts(collection, query=None):
+    return {doc["user_id"]: doc["count"] async for doc in collection.find(query or {})}
+
+
+def test_concurrent_startup_backfills_count_each_submission_once(db):
+    async def scenario():
+        await _seed_submissions(db, {"ana": 3, "bo": 2})
+        workers = [Leaderboards(db) for _ in range(3)]
+        await asyncio.gather(*(worker.rebuild_if_empty([db.submissions]) for worker in workers))
+        window = day_key(datetime.utcnow())
+        return await _counts(db.leaderboard_alltime), await _counts(db.leaderboard_weekly, {"window": window})
+
+    alltime, weekly = asyncio.run(scenario())
+    assert alltime == {"ana": 3, "bo": 2}
+    assert weekly == {"ana": 3, "bo": 2}
+
+
+async def _after(turns: int, awaitable):
+    for _ in range(turns):
+        await asyncio.sleep(0)
+    return await awaitable
+
+
+@pytest.mark.parametrize("backfill_delay,live_delay", [(0, 0), (0, 3), (3, 0), (5, 1), (1, 5)])
+def test_backfill_and_live_activity_count_once_in_any_order(db, backfill_delay, live_delay):
+    async def start_and_record(worker):
+        # Workers only serve requests once their own startup backfill check returned
+        await worker.rebuild_if_empty([db.submissions])
+        await worker.record_activity("ana", "ana")
+
+    async def scenario():
+        await _seed_submissions(db, {"ana": 2})
+        first, second = Leaderboards(db), Leaderboards(db)
+        await asyncio.gather(
+            _after(backfill_delay, first.rebuild_if_empty([db.submissions])),
+            _after(live_delay, start_and_record(second))
+        )
+        return await _counts(db.leaderboard_alltime)
+
+    assert asyncio.run(scenario()) == {"ana": 3}
+
+
+def test_existing_counters_are_not_backfilled_again(db):
+    async def scenario():
+        await _seed_submissions(db, {"ana": 2})
+        await db.leaderboard_alltime.insert_one({"user_id": "ana", "username": "ana", "count": 2})
+        await Leaderboards(db).rebuild_if_empty([db.submissions])
+        return await _counts(db.leaderboard_alltime)
+
+    assert asyncio.run(scenario()) == {"ana": 2}
+
+
+def test_window_rollover_keeps_concurrent_increments(db):
+    async def scenario():
+        yesterday = day_key(datetime.utcnow() - timedelta(days=1))
+        await db.leaderboard_daily.insert_one({"day": yesterday, "user_id": "ana", "username": "ana", "count": 4})
+        await db.leaderboard_meta.insert_one({"_id": "weekly", "window": yesterday})
+        reader, writer = Leaderboards(db), Leaderboards(db)
+        await asyncio.gather(reader.top_weekly(10), writer.record_activity("ana", "ana"), writer.record_activity("ana", "ana"))
+        return await reader.top_weekly(10)
+
+    top = asyncio.run(scenario())
+    assert [(row["user_id"], row["count"]) for row in top] == [("ana", 6)]
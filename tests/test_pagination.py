@@ -0,0 +1,77 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+
+from pagination import decode_cursor, encode_cursor, fetch_page
+
+
+async def _seed(collection, count: int, ties: int = 3):
+    # Every `ties` items share a created_at, so ordering falls back to id
+    base = datetime(2024, 1, 1)
+    await collection.insert_many([
+        {"id": f"item-{i:03d}", "group_id": "g", "created_at": base + timedelta(seconds=i // ties)}
+        for i in range(count)
+    ])
+
+
+def test_pages_cover_every_item_once_across_created_at_ties(db):
+    async def scenario():
+        await _seed(db.items, 10)
+        seen, cursor = [], None
+        while True:
+            page, cursor = await fetch_page(db.items, {"group_id": "g"}, 3, cursor, {"_id": 0})
+            seen.extend(item["id"] for item in page)
+            if cursor is None:
+                return seen
+
+    seen = asyncio.run(scenario())
+    assert seen == [f"item-{i:03d}" for i in reversed(range(10))]
+
+
+def test_last_full_page_has_no_cursor(db):
+    async def scenario():
+        await _seed(db.items, 4)
+        return await fetch_page(db.items, {}, 4)
+
+    page, cursor = asyncio.run(scenario())
+    assert len(page) == 4 and cursor is None
+
+
+@pytest.mark.parametrize("limit", [0, -1])
+def test_empty_limit_returns_empty_page(db, limit):
+    async def scenario():
+        await _seed(db.items, 3)
+        return await fetch_page(db.items, {}, limit)
+
+    assert asyncio.run(scenario()) == ([], None)
+
+
+def test_cursor_round_trip():
+    created_at = datetime(2024, 5, 6, 7, 8, 9, 123000)
+    assert decode_cursor(encode_cursor(created_at, "abc")) == (created_at, "abc")
+
+
+@pytest.mark.parametrize("cursor", ["not-base64!", "bm9wZQ", encode_cursor("yesterday", "x")])
+def test_malformed_cursor_is_a_400(cursor):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor)
+    assert error.value.status_code == 400
+
+
+@pytest.mark.parametrize("limit", ["0", "-5", "101"])
+def test_feed_endpoints_reject_out_of_range_limits(api, limit):
+    async def scenario():
+        async with api() as client:
+            return [
+                (await client.get(path, params={"limit": limit, "user_id": "u"})).status_code
+                for path in (
+                    "/api/groups/g/submissions",
+                    "/api/submissions/feed",
+                    "/api/notifications/u",
+                    "/api/global-submissions/s/comments",
+                )
+            ]
+
+    assert asyncio.run(scenario()) == [422, 422, 422, 422]
@@ -0,0 +1,72 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from pymongo.errors import AutoReconnect
+
+from migrations import run_migrations
+from scheduler import ChallengeScheduler
+
+
+def test_challenges_from_before_activation_tracking_are_not_announced_again(db):
+    now = datetime.utcnow()
+
+    async def scenario():
+        announced = []
+
+        async def on_activate(challenge):
+            announced.append(challenge["id"])
+
+        await db.global_challenges.insert_many([
+            # Superseded by a newer challenge under the old code, still before its expiry
+            {"id": "superseded", "created_at": now - timedelta(hours=2), "expires_at": now + timedelta(hours=4), "is_active": False},
+            {"id": "live", "created_at": now - timedelta(hours=1), "expires_at": now + timedelta(hours=5), "is_active": True},
+            # Scheduled for the future: its activation is still pending
+            {"id": "scheduled", "created_at": now + timedelta(hours=1), "expires_at": now + timedelta(hours=7), "is_active": False},
+        ])
+        await run_migrations(db, ["0005_challenge_activations"])
+
+        scheduler = ChallengeScheduler(db.global_challenges, on_activate=on_activate)
+        await scheduler.reload()
+        await scheduler.run_due()
+        active = [c["id"] for c in await db.global_challenges.find({"is_active": True}).to_list(length=None)]
+        pending = [c["id"] for c in await db.global_challenges.find({"activated_at": None}).to_list(length=None)]
+        return announced, active, pending
+
+    assert asyncio.run(scenario()) == ([], ["live"], ["scheduled"])
+
+
+class FlakyCollection:
+    """Collection whose first update_one fails like a dropped connection"""
+
+    def __init__(self, collection):
+        self._collection = collection
+        self.failures = 1
+
+    def __getattr__(self, name):
+        return getattr(self._collection, name)
+
+    async def update_one(self, *args, **kwargs):
+        if self.failures:
+            self.failures -= 1
+            raise AutoReconnect("connection reset")
+        return await self._collection.update_one(*args, **kwargs)
+
+
+def test_failed_expiry_is_retried_instead_of_dropped(db):
+    now = datetime.utcnow()
+
+    async def scenario():
+        await db.global_challenges.insert_one({
+            "id": "ended", "created_at": now - timedelta(hours=6), "expires_at": now - timedelta(seconds=1),
+            "is_active": True, "activated_at": now - timedelta(hours=6),
+        })
+        scheduler = ChallengeScheduler(FlakyCollection(db.global_challenges), retry_delay=0)
+        await scheduler.reload()
+        results = [await scheduler.run_due()]
+        still_active = (await db.global_challenges.find_one({"id": "ended"}))["is_active"]
+        results.append(await scheduler.run_due())
+        return results, still_active, (await db.global_challenges.find_one({"id": "ended"}))["is_active"]
+
+    results, active_after_failure, active_after_retry = asyncio.run(scenario())
+    assert results == [{"activate": 0, "expire": 0}, {"activate": 0, "expire": 1}]
+    assert (active_after_failure, active_after_retry) == (True, False)
@@ -0,0 +1,19 @@
+import asyncio
+
+from search import search_prefixes
+
+
+def test_exact_username_is_found_when_the_prefix_overflows_the_candidates(server, api):
+    async def scenario():
+        # The exact match is stored last, past the first CANDIDATE_LIMIT prefix matches
+        usernames = [f"jo{i:03d}" for i in range(60)] + ["jo"]
+        await server.db.users.insert_many([
+            {"id": username, "username": username, "full_name": "Jo Doe", "search_prefixes": search_prefixes(username, "Jo Doe")}
+            for username in usernames
+        ])
+        async with api() as client:
+            return (await client.get("/api/users/search", params={"q": "jo"})).json()
+
+    results = asyncio.run(scenario())
+    assert results[0]["username"] == "jo"
+    assert len(results) == 10
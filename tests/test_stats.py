@@ -0,0 +1,23 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from stats import TOP_SUBMISSION_FIELDS, ChallengeStats
+
+
+def test_cached_stats_of_an_expired_challenge_leave_out_fields_that_still_change(db):
+    async def scenario():
+        stats = ChallengeStats(db.global_submissions)
+        await db.global_submissions.insert_one({
+            "id": "s1", "challenge_id": "c", "user_id": "u", "username": "u", "description": "", "photo_url": None,
+            "votes": 2, "created_at": datetime(2024, 1, 1), "comment_count": 1, "comments": [{"id": "c1"}],
+            "reactions": {},
+        })
+        challenge = {"id": "c", "expires_at": datetime.utcnow() - timedelta(hours=1)}
+        first = await stats.get(challenge)
+        # Comments are still accepted after expiry; the cached stats must not depend on them
+        await db.global_submissions.update_one({"id": "s1"}, {"$inc": {"comment_count": 1}})
+        return first, await stats.get(challenge)
+
+    first, cached = asyncio.run(scenario())
+    assert set(first["top_submissions"][0]) == set(TOP_SUBMISSION_FIELDS)
+    assert (first["total_submissions"], first["total_votes"]) == (1, 2) and cached == first
@@ -0,0 +1,80 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from timelines import TimelineService
+
+BASE = datetime(2024, 1, 1)
+
+
+async def _yield(times: int):
+    for _ in range(times):
+        await asyncio.sleep(0)
+
+
+async def _submit(db, service, submission_id, group_id, minute, members=()):
+    submission = {"id": submission_id, "group_id": group_id, "created_at": BASE + timedelta(minutes=minute)}
+    await db.submissions.insert_one(dict(submission))
+    await service.fan_out(members, submission)
+
+
+async def _feed(service, user_id, group_ids):
+    page, _ = await service.page(user_id, group_ids, 50)
+    return [submission["id"] for submission in page]
+
+
+@pytest.mark.parametrize("delay", range(8))
+def test_submission_fanned_out_during_a_rebuild_is_kept(db, delay):
+    async def scenario():
+        service = TimelineService(db.user_timelines, db.submissions)
+        await _submit(db, service, "old", "g", 0)
+
+        async def submit_later():
+            await _yield(delay)
+            await _submit(db, service, "new", "g", 1, members=["u"])
+
+        await asyncio.gather(_feed(service, "u", ["g"]), submit_later())
+        return await _feed(service, "u", ["g"])
+
+    assert asyncio.run(scenario()) == ["new", "old"]
+
+
+@pytest.mark.parametrize("delay", range(8))
+def test_join_during_a_rebuild_is_not_overwritten(db, delay):
+    async def scenario():
+        service = TimelineService(db.user_timelines, db.submissions)
+        await _submit(db, service, "mine", "g1", 0)
+        await _submit(db, service, "joined", "g2", 1)
+
+        async def join_later():
+            await _yield(delay)
+            await service.invalidate("u")
+
+        # The rebuild started with the old group list; the join must still win
+        await asyncio.gather(_feed(service, "u", ["g1"]), join_later())
+        return await _feed(service, "u", ["g1", "g2"])
+
+    assert asyncio.run(scenario()) == ["joined", "mine"]
+
+
+def test_joining_by_invite_code_brings_the_group_into_the_feed(server, api):
+    async def scenario():
+        await server.db.users.insert_one({"id": "u", "username": "u", "groups": ["g1"]})
+        await server.db.groups.insert_many([
+            {"id": "g1", "members": ["u"], "invite_code": "AAA", "max_members": 7},
+            {"id": "g2", "members": ["other"], "invite_code": "BBB", "max_members": 7},
+        ])
+        for submission_id, group_id, minute in (("mine", "g1", 0), ("joined", "g2", 1)):
+            await server.db.submissions.insert_one({
+                "id": submission_id, "group_id": group_id, "user_id": "other", "username": "other",
+                "challenge_type": "run", "description": "", "created_at": BASE + timedelta(minutes=minute),
+            })
+
+        async with api() as client:
+            before = await client.get("/api/submissions/feed", params={"user_id": "u"})
+            joined = await client.post("/api/groups/g2/join-by-code", data={"invite_code": "BBB", "user_id": "u"})
+            after = await client.get("/api/submissions/feed", params={"user_id": "u"})
+        return [s["id"] for s in before.json()], joined.status_code, [s["id"] for s in after.json()]
+
+    assert asyncio.run(scenario()) == (["mine"], 200, ["joined", "mine"])
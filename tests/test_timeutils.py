@@ -0,0 +1,42 @@
+import asyncio
+import time
+from datetime import datetime
+
+import pytest
+
+from timeutils import migrate_string_datetimes
+
+NOON_UTC = datetime(2024, 1, 1, 12, 0)
+
+
+@pytest.fixture
+def utc_minus_five(monkeypatch):
+    # POSIX-style zone names invert the sign: Etc/GMT+5 is five hours behind UTC, with no DST
+    monkeypatch.setenv("TZ", "Etc/GMT+5")
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+def test_migration_reads_each_field_with_the_clock_that_wrote_it(db, utc_minus_five):
+    utcnow, now = "2024-01-01T12:00:00", "2024-01-01T07:00:00"
+
+    async def scenario():
+        await db.follows.insert_one({"id": "f", "created_at": utcnow})
+        await db.global_challenges.insert_one({"id": "c", "created_at": now, "expires_at": now})
+        await db.notifications.insert_many([
+            {"id": "follower", "type": "new_follower", "created_at": utcnow, "read_at": now},
+            {"id": "drop", "type": "global_challenge_drop", "created_at": now},
+        ])
+        await migrate_string_datetimes(db)
+        follow = await db.follows.find_one({"id": "f"})
+        challenge = await db.global_challenges.find_one({"id": "c"})
+        follower = await db.notifications.find_one({"id": "follower"})
+        drop = await db.notifications.find_one({"id": "drop"})
+        return [
+            follow["created_at"], challenge["created_at"], challenge["expires_at"],
+            follower["created_at"], follower["read_at"], drop["created_at"],
+        ]
+
+    assert asyncio.run(scenario()) == [NOON_UTC] * 6
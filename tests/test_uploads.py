@@ -0,0 +1,89 @@
+import asyncio
+import base64
+
+import httpx
+import pytest
+from fastapi import FastAPI, File, Form, UploadFile
+
+from blob_store import LocalBlobStore
+from uploads import RequestSizeLimitMiddleware, migrate_inline_photos
+
+LIMIT = 1024
+
+
+def _app(calls):
+    app = FastAPI()
+    app.add_middleware(RequestSizeLimitMiddleware, max_bytes=LIMIT)
+
+    @app.post("/upload")
+    async def upload(description: str = Form(...), photo: UploadFile = File(...)):
+        calls.append(description)
+        return {"size": len(await photo.read())}
+
+    return app
+
+
+def _multipart(size: int):
+    request = httpx.Request(
+        "POST", "http://testserver/upload", data={"description": "x"}, files={"photo": ("a.jpg", b"a" * size, "image/jpeg")}
+    )
+    return request.headers["content-type"], request.read()
+
+
+async def _chunks(body: bytes):
+    for start in range(0, len(body), 256):
+        yield body[start:start + 256]
+
+
+@pytest.mark.parametrize("streamed", [False, True])
+def test_oversized_bodies_are_refused_before_the_handler_runs(streamed):
+    calls = []
+
+    async def scenario():
+        content_type, body = _multipart(4 * LIMIT)
+        transport = httpx.ASGITransport(app=_app(calls))
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+            # A streamed body has no Content-Length, so the limit is enforced while reading
+            content = _chunks(body) if streamed else body
+            return await client.post("/upload", content=content, headers={"content-type": content_type})
+
+    response = asyncio.run(scenario())
+    assert response.status_code == 413
+    assert calls == []
+
+
+def test_bodies_within_the_limit_reach_the_handler():
+    calls = []
+
+    async def scenario():
+        content_type, body = _multipart(LIMIT // 2)
+        transport = httpx.ASGITransport(app=_app(calls))
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+            return await client.post("/upload", content=_chunks(body), headers={"content-type": content_type})
+
+    response = asyncio.run(scenario())
+    assert response.status_code == 200 and response.json() == {"size": LIMIT // 2}
+    assert calls == ["x"]
+
+
+def test_inline_photos_move_to_the_blob_store(db, tmp_path):
+    png = b"\x89PNG\r\n\x1a\n" + b"pixels"
+
+    async def scenario():
+        store = LocalBlobStore(tmp_path)
+        await db.global_submissions.insert_many([
+            {"id": "legacy", "photo_data": base64.b64encode(png).decode()},
+            {"id": "no-photo", "photo_data": None},
+        ])
+        await db.submissions.insert_one({"id": "current", "photo_url": "/api/media/abc"})
+        migrated = await migrate_inline_photos(db, store)
+
+        legacy = await db.global_submissions.find_one({"id": "legacy"})
+        info = await store.stat(legacy["photo"]["hash"])
+        stored = b"".join([chunk async for chunk in store.iter_chunks(info.hash)])
+        leftovers = await db.global_submissions.count_documents({"photo_data": {"$exists": True}})
+        return migrated, legacy["photo_url"], info.content_type, stored, leftovers
+
+    migrated, photo_url, content_type, stored, leftovers = asyncio.run(scenario())
+    assert (migrated, content_type, stored, leftovers) == (2, "image/png", png, 0)
+    assert photo_url.startswith("/api/media/")
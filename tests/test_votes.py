@@ -0,0 +1,54 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+
+from votes import VoteEngine
+
+
+async def _engine(db):
+    await db.global_votes.create_index([("submission_id", 1), ("user_id", 1)], unique=True)
+    await db.global_challenges.insert_many([
+        {"id": "live", "expires_at": datetime.utcnow() + timedelta(hours=1)},
+        {"id": "ended", "expires_at": datetime.utcnow() - timedelta(hours=1)},
+    ])
+    await db.global_submissions.insert_many([
+        {"id": "s1", "challenge_id": "live", "user_id": "author", "votes": 0},
+        {"id": "late", "challenge_id": "ended", "user_id": "author", "votes": 0},
+    ])
+    return VoteEngine(db.global_votes, db.global_submissions, db.global_challenges)
+
+
+def test_concurrent_votes_are_all_counted(db):
+    async def scenario():
+        engine = await _engine(db)
+        await asyncio.gather(*(engine.toggle("s1", f"voter-{i}") for i in range(10)))
+        submission = await db.global_submissions.find_one({"id": "s1"})
+        return submission["votes"], await db.global_votes.count_documents({})
+
+    assert asyncio.run(scenario()) == (10, 10)
+
+
+def test_second_toggle_removes_the_vote(db):
+    async def scenario():
+        engine = await _engine(db)
+        return [await engine.toggle("s1", "voter") for _ in range(2)]
+
+    assert asyncio.run(scenario()) == [(True, 1), (False, 0)]
+
+
+@pytest.mark.parametrize("submission_id, user_id, status", [
+    ("missing", "voter", 404),
+    ("s1", "author", 400),
+    ("late", "voter", 400),
+])
+def test_rejected_votes_write_nothing(db, submission_id, user_id, status):
+    async def scenario():
+        engine = await _engine(db)
+        with pytest.raises(HTTPException) as error:
+            await engine.toggle(submission_id, user_id)
+        votes = sum(s["votes"] for s in await db.global_submissions.find().to_list(length=None))
+        return error.value.status_code, votes, await db.global_votes.count_documents({})
+
+    assert asyncio.run(scenario()) == (status, 0, 0)
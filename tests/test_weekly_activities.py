@@ -0,0 +1,27 @@
+import asyncio
+
+
+def test_concurrent_submissions_fill_exactly_seven_slots(interleaved_server, api):
+    server = interleaved_server
+    members = [f"u{i}" for i in range(7)]
+
+    async def scenario():
+        await server.db.groups.insert_one({
+            "id": "g", "members": members, "submission_phase_active": True,
+            "activities_submitted_this_week": 3, "current_week_start": "2024-01-01",
+        })
+        async with api() as client:
+            responses = await asyncio.gather(*(
+                client.post("/api/groups/g/submit-activity", data={
+                    "activity_title": "Run", "activity_description": "5k", "user_id": member
+                })
+                for member in members
+            ))
+        group = await server.db.groups.find_one({"id": "g"})
+        orders = sorted(s["submission_order"] for s in await server.db.weekly_activity_submissions.find().to_list(length=None))
+        return sorted(r.status_code for r in responses), group, orders
+
+    statuses, group, orders = asyncio.run(scenario())
+    assert statuses == [200] * 4 + [400] * 3
+    assert orders == [4, 5, 6, 7]
+    assert group["activities_submitted_this_week"] == 7 and group["submission_phase_active"] is False